@@ -1,64 +1,310 @@
+import queue
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
 import tkinter.messagebox as messagebox
 
+# Параметры подключения к базе данных
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'is_expansion',
+    'user': 'root',      # измените на вашего пользователя
+    'password': 'root',      # измените на ваш пароль
+    'charset': 'utf8',
+    # Одиночные запросы фиксируются сразу: чтение не открывает транзакцию, которую пришлось бы
+    # откатывать при возврате соединения в пул. Транзакции открываются явно (transaction())
+    'autocommit': True
+}
+
+# Таблицы, упомянутые в запросе (для сброса кэша при записи)
+TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+`?(\w+)", re.IGNORECASE)
+
+
+class ConnectionPool:
+    """Пул соединений с MySQL: проверка простаивавших соединений и переподключение"""
+    
+    def __init__(self, size=5, check_interval=30.0, timeout=10.0, **config):
+        self.config = config
+        self.size = size
+        self.check_interval = check_interval  # после такого простоя соединение проверяется, с
+        self.timeout = timeout  # ожидание свободного соединения, с
+        self.idle = queue.LifoQueue()  # (соединение, время возврата в пул)
+        self.connections = set()  # все открытые соединения, в том числе выданные
+        self.created = 0
+        self.reconnects = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Выдача соединения из пула (новое создается, пока не достигнут размер пула)"""
+        try:
+            connection, released_at = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            if create:
+                try:
+                    connection = mysql.connector.connect(**self.config)
+                    self.connections.add(connection)
+                    return connection
+                except Error:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+            try:
+                connection, released_at = self.idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolError("Нет свободных соединений с базой данных")
+        
+        # Долго простаивавшее соединение могло быть закрыто сервером (wait_timeout)
+        if time.monotonic() - released_at > self.check_interval and not connection.is_connected():
+            try:
+                connection.reconnect(attempts=3, delay=1)
+            except Error:
+                self.discard(connection)
+                raise
+            self.reconnects += 1
+        return connection
+    
+    def release(self, connection):
+        """Возврат соединения в пул"""
+        if connection.in_transaction:
+            # Только транзакция, прерванная без фиксации и отката (чтение в режиме
+            # autocommit транзакцию не открывает): изменения не должны достаться следующему запросу
+            connection.rollback()
+        self.idle.put((connection, time.monotonic()))
+    
+    def discard(self, connection):
+        """Закрытие соединения с ошибкой связи (место в пуле освобождается)"""
+        try:
+            connection.close()
+        except Error:
+            pass
+        with self.lock:
+            self.connections.discard(connection)
+            self.created -= 1
+    
+    def close(self):
+        """Закрытие всех соединений пула, включая выданные и еще не возвращенные"""
+        while True:
+            try:
+                self.idle.get_nowait()
+            except queue.Empty:
+                break
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            self.discard(connection)
+
+
+class QueryCache:
+    """Кэш результатов чтения с вытеснением давно не использованных (LRU) по объему памяти"""
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (запрос, параметры) -> (строки, размер, таблицы)
+        self.tables = {}  # таблица -> ключи записей, прочитанных из нее
+        self.bytes = 0
+        self.generation = 0  # меняется при каждом сбросе
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def key(query, params):
+        # Запросы, отличающиеся только пробелами и переносами строк, считаются одинаковыми
+        return " ".join(query.split()), tuple(params) if params else ()
+    
+    def get(self, key):
+        """Строки из кэша или None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[0])
+    
+    def put(self, key, rows, generation):
+        """Сохранение результата, если с начала чтения таблицы не изменялись"""
+        size = sys.getsizeof(rows) + sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in rows)
+        if size > self.max_bytes:
+            return
+        tables = {name.lower() for name in TABLE_PATTERN.findall(key[0])}
+        with self.lock:
+            if generation != self.generation or key in self.entries:
+                return
+            self.entries[key] = (list(rows), size, tables)
+            self.bytes += size
+            for table in tables:
+                self.tables.setdefault(table, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+    
+    def remove(self, key):
+        # Вызывается под self.lock
+        rows, size, tables = self.entries.pop(key)
+        self.bytes -= size
+        for table in tables:
+            keys = self.tables.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tables[table]
+    
+    def invalidate(self, tables):
+        """Сброс результатов, прочитанных из указанных таблиц"""
+        with self.lock:
+            self.generation += 1
+            for table in tables:
+                for key in list(self.tables.get(table.lower(), ())):
+                    self.remove(key)
+    
+    def stats(self):
+        """Счетчики попаданий и промахов, число записей и занятая память"""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self.entries), 'bytes': self.bytes}
+
+
 class Database:
-    def __init__(self):
-        self.connection = None
+    def __init__(self, pool_size=5, cache_bytes=0):
+        self.pool = ConnectionPool(pool_size, **DB_CONFIG)
+        self.local = threading.local()  # соединение открытой транзакции (в каждом потоке свое)
+        # Кэш результатов чтения (0 - без кэша)
+        self.cache = QueryCache(cache_bytes) if cache_bytes else None
         self.connect()
     
     def connect(self):
+        # Проверка доступности базы: первое соединение пула создается сразу
         try:
-            self.connection = mysql.connector.connect(
-                host='localhost',
-                database='is_expansion',
-                user='root',      # измените на вашего пользователя
-                password='root',      # измените на ваш пароль
-                charset='utf8'
-            )
+            self.pool.release(self.pool.acquire())
             return True
         except Error as e:
             messagebox.showerror("Ошибка", f"Не удалось подключиться к базе данных: {e}")
             return False
     
-    def execute_query(self, query, params=None):
-        if not self.connection:
-            if not self.connect():
-                return None
+    def in_transaction(self):
+        """Выполняется ли в текущем потоке транзакция transaction()"""
+        return getattr(self.local, 'connection', None) is not None
+    
+    @contextmanager
+    def transaction(self):
+        """Несколько запросов с одной фиксацией; при ошибке все изменения откатываются"""
+        if self.in_transaction():
+            # Вложенная транзакция входит во внешнюю
+            yield self
+            return
         
-        cursor = self.connection.cursor()
+        connection = self.pool.acquire()
+        self.local.connection = connection
+        self.local.written = set()  # таблицы, измененные в транзакции
         try:
-            if params:
+            connection.start_transaction()
+            yield self
+            connection.commit()
+            # Чтения, выполненные до фиксации, могли попасть в кэш после сброса при записи
+            self.invalidate(*self.local.written)
+        except (OperationalError, InterfaceError):
+            # Связь потеряна - соединение не возвращается в пул
+            self.local.connection = None
+            self.pool.discard(connection)
+            raise
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            if self.local.connection is not None:
+                self.local.connection = None
+                self.pool.release(connection)
+    
+    def invalidate(self, *tables):
+        """Сброс кэшированных результатов чтения из таблиц"""
+        if self.cache is not None and tables:
+            self.cache.invalidate(tables)
+    
+    def run(self, query, params, fetch, cached=True):
+        """Выполнение запроса на соединении транзакции, на соединении из пула или из кэша"""
+        # Запись сбрасывает кэш для всех таблиц запроса
+        if not fetch:
+            written = {name.lower() for name in TABLE_PATTERN.findall(query)}
+        
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            cursor = connection.cursor()
+            try:
                 cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            self.connection.commit()
-            return cursor
+                if fetch:
+                    return cursor.fetchall()
+                self.local.written.update(written)
+                self.invalidate(*written)
+                return cursor
+            finally:
+                cursor.close()
+        
+        # Чтение вне транзакции берется из кэша (cached=False - всегда из базы)
+        key = None
+        if fetch and cached and self.cache is not None:
+            key = QueryCache.key(query, params)
+            rows = self.cache.get(key)
+            if rows is not None:
+                return rows
+            generation = self.cache.generation
+        
+        # Чтение при разрыве связи повторяется на новом соединении. Запись не повторяется:
+        # при потере ответа неизвестно, была ли она зафиксирована
+        attempts = 2 if fetch else 1
+        for attempt in range(attempts):
+            connection = self.pool.acquire()
+            try:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(query, params)
+                    # Запись фиксируется сервером сразу (autocommit)
+                    result = cursor.fetchall() if fetch else cursor
+                finally:
+                    cursor.close()
+            except (OperationalError, InterfaceError):
+                self.pool.discard(connection)
+                if attempt + 1 == attempts:
+                    raise
+                continue
+            except Error:
+                self.pool.release(connection)
+                raise
+            self.pool.release(connection)
+            if key is not None:
+                self.cache.put(key, result, generation)
+            elif not fetch:
+                self.invalidate(*written)
+            return result
+    
+    def execute_query(self, query, params=None):
+        try:
+            return self.run(query, params, fetch=False)
         except Error as e:
+            if self.in_transaction():
+                raise  # откат выполняет transaction()
             messagebox.showerror("Ошибка", f"Ошибка выполнения запроса: {e}")
             return None
-        finally:
-            cursor.close()
     
     def fetch_all(self, query, params=None):
-        if not self.connection:
-            if not self.connect():
-                return []
-        
-        cursor = self.connection.cursor()
         try:
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            result = cursor.fetchall()
-            return result
+            return self.run(query, params, fetch=True)
         except Error as e:
+            if self.in_transaction():
+                raise
             messagebox.showerror("Ошибка", f"Ошибка выполнения запроса: {e}")
             return []
-        finally:
-            cursor.close()
     
     def close(self):
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
\ No newline at end of file
+        self.pool.close()
\ No newline at end of file
@@ -2,14 +2,79 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from database import Database
+from query_executor import QueryExecutor
 import os
 
+# Список предложений читается страницами по ключу сортировки (priority, id):
+# следующая страница начинается после последней загруженной строки, без OFFSET
+LIST_QUERY = "SELECT id, department, proposal, priority, cost FROM proposal"
+PAGE_AFTER_QUERY = (LIST_QUERY + " WHERE priority < %s OR (priority = %s AND id > %s)"
+                    " ORDER BY priority DESC, id LIMIT %s")
+PAGE_BEFORE_QUERY = (LIST_QUERY + " WHERE priority > %s OR (priority = %s AND id < %s)"
+                     " ORDER BY priority, id DESC LIMIT %s")
+# Переход в произвольное место списка (перетаскивание полосы прокрутки)
+WINDOW_QUERY = LIST_QUERY + " ORDER BY priority DESC, id LIMIT %s OFFSET %s"
+
+# Место добавленной строки определяет сервер: столбец сравнивается по своим правилам
+# (collation), как и в ORDER BY. Сначала строка сравнивается с первой и последней
+# загруженными строками - вне загруженных нужны только сдвиг номеров и число строк
+ROW_PLACE_QUERY = """SELECT priority > %s OR (priority = %s AND id < %s),
+                            priority < %s OR (priority = %s AND id > %s)
+                     FROM proposal WHERE id = %s"""
+# Номер среди загруженных: строки от первой загруженной до добавленной (не больше загруженных и новых)
+BUFFER_INDEX_QUERY = """SELECT COUNT(*) FROM proposal
+                        WHERE (priority < %s OR (priority = %s AND id >= %s))
+                          AND (priority > %s OR (priority = %s AND id < %s))"""
+# Номер строки в начале списка: перед ней могут быть только новые строки
+HEAD_INDEX_QUERY = "SELECT COUNT(*) FROM proposal WHERE priority > %s OR (priority = %s AND id < %s)"
+
+# Журнал добавлений: номер изменения seq растет монотонно, клиент запоминает последний
+# примененный и запрашивает только более новые. Записывается только добавление предложений
+# (изменение и удаление в приложении не предусмотрены)
+CHANGE_LOG_TABLE = """CREATE TABLE IF NOT EXISTS proposal_change (
+                          seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+                          proposal_id INT NOT NULL,
+                          priority VARCHAR(20) NOT NULL,
+                          action ENUM('insert') NOT NULL)"""
+CHANGE_LOG_INSERT = "INSERT INTO proposal_change (proposal_id, priority, action) VALUES (%s, %s, %s)"
+CHANGES_QUERY = "SELECT seq, proposal_id FROM proposal_change WHERE seq > %s ORDER BY seq"
+CHANGES_POLL_MS = 5000
+
+# Сводка для отчета за один проход по таблице
+STATISTICS_QUERY = """SELECT COUNT(*), COALESCE(SUM(priority = 'Высокий'), 0), COALESCE(SUM(cost), 0)
+                      FROM proposal"""
+
+# Цвета строк в зависимости от приоритета
+PRIORITY_COLORS = {
+    "Высокий": "#FF6B6B",
+    "Средний": "#FFD166",
+    "Низкий": "#06D6A0"
+}
+
 class MainForm:
     def __init__(self, root):
         self.root = root
         self.root.title("Предложения по расширению ИС")
         self.root.geometry("900x500")
-        self.db = Database()
+        self.db = Database(cache_bytes=16 * 1024 * 1024)
+        
+        # Запросы выполняются в фоновых потоках, результаты приходят через root.after
+        self.executor = QueryExecutor(self.root)
+        self.statistics = ProposalStatistics(self.db)
+        
+        # Виртуальный список: в таблице только видимые строки, в памяти - окно с запасом
+        self.page_size = 100
+        self.total_count = 0
+        self.top = 0  # номер первой видимой строки
+        self.visible_rows = 15
+        self.buffer = []  # загруженные строки
+        self.buffer_start = 0  # номер первой загруженной строки
+        self.buffer_version = 0  # меняется при полной перезагрузке (старые страницы отбрасываются)
+        self.loading = True  # до создания журнала изменений список не загружается
+        self.selected_id = None
+        self.change_seq = 0  # последнее примененное изменение журнала
+        self.refresh_pending = False
+        self.reveal_id = None  # добавленное в этом окне предложение, к которому нужно прокрутить список
         
         # Устанавливаем иконку (если есть)
         try:
@@ -18,7 +83,10 @@ class MainForm:
             pass
         
         self.setup_ui()
-        self.load_proposals()
+        self.executor.add_busy_listener(self.show_busy)
+        # Журнал изменений создается в фоне, список загружается после него
+        self.executor.submit(self.db.run, CHANGE_LOG_TABLE, None, False,
+                             on_done=self.on_schema_ready, on_error=self.on_schema_error, owner=self)
         
         # Обработка закрытия окна
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -50,16 +118,32 @@ class MainForm:
             self.tree.heading(col, text=col)
             self.tree.column(col, width=width, anchor=anchor)
         
-        # Полосы прокрутки
-        v_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        # Цвета строк настраиваются один раз
+        for priority, color in PRIORITY_COLORS.items():
+            self.tree.tag_configure(priority, background=color)
+        
+        # Полосы прокрутки (вертикальная прокручивает весь список, а не строки таблицы)
+        self.v_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.on_scroll)
         h_scrollbar = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(xscrollcommand=h_scrollbar.set)
+        
+        self.tree.bind("<Configure>", self.on_tree_resize)
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", self.on_mouse_wheel)
+        self.tree.bind("<Button-5>", self.on_mouse_wheel)
+        self.tree.bind("<Prior>", lambda event: self.on_scroll("scroll", -1, "pages") or "break")
+        self.tree.bind("<Next>", lambda event: self.on_scroll("scroll", 1, "pages") or "break")
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
         
         # Размещение элементов
         self.tree.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.v_scrollbar.grid(row=0, column=1, sticky="ns")
         h_scrollbar.grid(row=1, column=0, sticky="ew")
         
+        # Число предложений и показанные строки
+        self.count_label = tk.Label(table_frame, text="", font=("Arial", 9), fg="gray", anchor="e")
+        self.count_label.grid(row=2, column=0, columnspan=2, sticky="e")
+        
         # Настройка веса строк и колонок
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
@@ -86,29 +170,305 @@ class MainForm:
         hint_label = tk.Label(self.root, text="Выберите предложение и нажмите 'Просмотр деталей' для получения подробной информации",
                              font=("Arial", 9), fg="gray")
         hint_label.pack(pady=5)
+        
+        # Индикатор выполнения запросов
+        self.busy_label = tk.Label(self.root, text="", font=("Arial", 9), fg="#FF9800")
+        self.busy_label.pack(pady=(0, 5))
+    
+    def show_busy(self, count):
+        # Пока есть невыполненные запросы, показываются надпись и курсор ожидания
+        if count:
+            self.busy_label.config(text=f"⏳ Выполняется запросов к базе: {count}")
+            self.root.config(cursor="watch")
+        else:
+            self.busy_label.config(text="")
+            self.root.config(cursor="")
+    
+    def on_schema_ready(self, result):
+        self.loading = False
+        self.load_proposals()
+        self.root.after(CHANGES_POLL_MS, self.poll_changes)
+    
+    def on_schema_error(self, error):
+        # Журнал мог быть создан ранее (например, нет прав на CREATE) - список все равно загружается
+        messagebox.showerror("Ошибка", f"Не удалось создать журнал изменений: {error}")
+        self.on_schema_ready(None)
     
     def load_proposals(self):
-        # Очистка таблицы
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Загрузка данных из БД
-        query = "SELECT id, department, proposal, priority, cost FROM proposal ORDER BY priority DESC, id"
-        proposals = self.db.fetch_all(query)
-        
-        # Цвета для приоритетов
-        priority_colors = {
-            "Высокий": "#FF6B6B",
-            "Средний": "#FFD166",
-            "Низкий": "#06D6A0"
-        }
-        
-        for proposal in proposals:
-            item = self.tree.insert("", "end", values=proposal)
-            # Устанавливаем цвет строки в зависимости от приоритета
-            if proposal[3] in priority_colors:
-                self.tree.tag_configure(proposal[3], background=priority_colors[proposal[3]])
-                self.tree.item(item, tags=(proposal[3],))
+        # Полное обновление: число предложений и окно строк вокруг текущей позиции
+        self.buffer_version += 1
+        self.request_window(self.top)
+    
+    def request_window(self, top):
+        # Загрузка окна строк с запасом в страницу с каждой стороны (переход по номеру строки)
+        offset = max(0, top - self.page_size)
+        self.loading = True
+        self.executor.submit(self.fetch_window, offset, self.visible_rows + 2 * self.page_size,
+                             on_done=self.on_window_loaded, on_error=self.on_list_error, owner=self)
+    
+    def fetch_window(self, offset, limit):
+        """Номер изменения, число предложений и строки начиная с offset (выполняется в фоновом потоке)"""
+        # Чтение в одной транзакции - согласованный снимок строк и журнала изменений
+        with self.db.transaction():
+            seq = self.db.run("SELECT COALESCE(MAX(seq), 0) FROM proposal_change", None, True)[0][0]
+            total = self.db.run("SELECT COUNT(*) FROM proposal", None, True)[0][0]
+            rows = self.db.run(WINDOW_QUERY, (limit, offset), True)
+        return seq, total, offset, rows
+    
+    def on_window_loaded(self, result):
+        self.change_seq, self.total_count, self.buffer_start, rows = result
+        self.buffer = list(rows)
+        self.buffer_version += 1
+        self.loading = False
+        self.scroll_to(self.top)
+        self.run_pending_refresh()
+    
+    def fetch_page(self, forward):
+        # Следующая или предыдущая страница по ключу крайней загруженной строки
+        if forward:
+            row = self.buffer[-1]
+            query = PAGE_AFTER_QUERY
+        else:
+            row = self.buffer[0]
+            query = PAGE_BEFORE_QUERY
+        params = (row[3], row[3], row[0], self.page_size)
+        version = self.buffer_version
+        self.loading = True
+        self.executor.submit(self.db.run, query, params, True,
+                             on_done=lambda rows: self.on_page_loaded(rows, forward, version),
+                             on_error=self.on_list_error, owner=self)
+    
+    def on_page_loaded(self, rows, forward, version):
+        if version != self.buffer_version:
+            return  # пока страница загружалась, список был перезагружен
+        self.loading = False
+        
+        if forward:
+            self.buffer.extend(rows)
+            if len(rows) < self.page_size:
+                # Достигнут конец списка - число строк уточняется
+                self.total_count = self.buffer_start + len(self.buffer)
+        else:
+            rows = rows[::-1]
+            self.buffer[:0] = rows
+            self.buffer_start -= len(rows)
+        
+        # В памяти остается не больше двух страниц с каждой стороны от видимых строк
+        buffer_end = self.buffer_start + len(self.buffer)
+        keep_start = max(self.buffer_start, self.top - 2 * self.page_size)
+        keep_end = min(buffer_end, self.top + self.visible_rows + 2 * self.page_size)
+        if keep_start < keep_end:
+            self.buffer = self.buffer[keep_start - self.buffer_start:keep_end - self.buffer_start]
+            self.buffer_start = keep_start
+        self.scroll_to(self.top)
+        self.run_pending_refresh()
+    
+    def on_list_error(self, error):
+        self.loading = False
+        messagebox.showerror("Ошибка", f"Ошибка выполнения запроса: {error}")
+    
+    def poll_changes(self):
+        # Периодическая проверка журнала: изменения других пользователей
+        self.refresh_changes()
+        self.root.after(CHANGES_POLL_MS, self.poll_changes)
+    
+    def refresh_changes(self):
+        # Обновление по журналу: стоимость зависит от числа изменений, а не от размера таблицы
+        if self.loading:
+            self.refresh_pending = True  # выполнится после текущей загрузки
+            return
+        self.refresh_pending = False
+        self.loading = True
+        version = self.buffer_version
+        # Пока идет чтение журнала, загруженные строки не меняются (self.loading)
+        first = self.buffer[0] if self.buffer else None
+        last = self.buffer[-1] if self.buffer else None
+        at_end = self.buffer_start + len(self.buffer) >= self.total_count
+        self.executor.submit(self.fetch_changes, self.change_seq, first, last, self.buffer_start == 0, at_end,
+                             on_done=lambda result: self.on_changes_loaded(result, version),
+                             on_error=self.on_changes_error, owner=self)
+    
+    def run_pending_refresh(self):
+        if self.refresh_pending and not self.loading:
+            self.refresh_changes()
+    
+    def fetch_changes(self, since, first, last, at_start, at_end):
+        """Номер последнего изменения после since и место добавленных строк (выполняется в фоновом потоке)"""
+        # Место - "before" или "after" для строк выше или ниже загруженных либо "inside" с номером
+        # среди загруженных. Одна транзакция - согласованный снимок журнала и таблицы, чтение мимо кэша
+        with self.db.transaction():
+            changes = self.db.run(CHANGES_QUERY, (since,), True)
+            if not changes:
+                return since, []
+            ids = tuple({change[1] for change in changes})
+            placeholders = ", ".join(["%s"] * len(ids))
+            rows = self.db.run(f"{LIST_QUERY} WHERE id IN ({placeholders})", ids, True)
+            located = []
+            for row in rows:
+                key = (row[3], row[3], row[0])
+                if first is None:
+                    before, after = True, False  # список пуст
+                else:
+                    before, after = self.db.run(ROW_PLACE_QUERY, (first[3], first[3], first[0],
+                                                                  last[3], last[3], last[0], row[0]), True)[0]
+                if before and not at_start:
+                    located.append(("before", None, row))
+                elif after and not at_end:
+                    located.append(("after", None, row))
+                elif before:
+                    located.append(("inside", self.db.run(HEAD_INDEX_QUERY, key, True)[0][0], row))
+                else:
+                    index = self.db.run(BUFFER_INDEX_QUERY, (first[3], first[3], first[0]) + key, True)[0][0]
+                    located.append(("inside", index, row))
+        # Номера посчитаны для итогового состояния, поэтому строки вставляются по возрастанию номера
+        located.sort(key=lambda item: -1 if item[1] is None else item[1])
+        return changes[-1][0], located
+    
+    def on_changes_loaded(self, result, version):
+        self.loading = False
+        last_seq, located = result
+        if last_seq != self.change_seq:
+            # Изменения других пользователей не сбрасывают кэш сами
+            self.db.invalidate("proposal")
+            self.statistics.invalidate()
+        if version != self.buffer_version:
+            # Пока читался журнал, список был перезагружен: изменения уже учтены
+            self.run_pending_refresh()
+            return
+        
+        for place, index, row in located:
+            if place == "before":
+                # Строка выше загруженных: номера загруженных и видимых строк сдвигаются
+                self.total_count += 1
+                self.buffer_start += 1
+                self.top += 1
+            elif place == "after":
+                self.total_count += 1  # строка ниже загруженных, будет прочитана при прокрутке
+            elif self.insert_row(row, index) and row[0] == self.reveal_id:
+                # Переход к добавленной в этом окне строке
+                position = self.buffer_start + index
+                if not self.top <= position < self.top + self.visible_rows:
+                    self.top = max(0, position - self.visible_rows // 2)
+            if row[0] == self.reveal_id:
+                self.reveal_id = None
+        self.change_seq = last_seq
+        
+        self.scroll_to(self.top)
+        self.run_pending_refresh()
+    
+    def on_changes_error(self, error):
+        # Ошибку не показываем: журнал будет прочитан при следующей проверке
+        self.loading = False
+    
+    def add_row(self, proposal_id):
+        """Показ предложения, добавленного в этом окне (номер известен из lastrowid)"""
+        # Строка и ее место в списке читаются вместе с остальными изменениями журнала
+        self.selected_id = proposal_id
+        self.reveal_id = proposal_id
+        self.refresh_changes()
+    
+    def insert_row(self, row, index):
+        """Вставка строки среди загруженных на место index; False, если строка уже загружена"""
+        if any(loaded[0] == row[0] for loaded in self.buffer):
+            return False
+        self.buffer.insert(index, row)
+        self.total_count += 1
+        if self.buffer_start + index < self.top:
+            self.top += 1  # видимые строки остаются на месте
+        return True
+    
+    def scroll_to(self, top):
+        # Переход к строке top: из памяти, подгрузкой соседней страницы или загрузкой нового окна
+        self.top = max(0, min(top, self.total_count - self.visible_rows))
+        end = min(self.top + self.visible_rows, self.total_count)
+        buffer_end = self.buffer_start + len(self.buffer)
+        self.update_scrollbar()
+        
+        if self.buffer_start <= self.top and end <= buffer_end:
+            self.render_window()
+            self.prefetch()
+            return
+        if self.loading:
+            return  # позиция будет показана после текущей загрузки
+        
+        if (not self.buffer or self.top >= buffer_end + self.page_size
+                or end <= self.buffer_start - self.page_size):
+            self.request_window(self.top)
+        elif end > buffer_end:
+            self.fetch_page(forward=True)
+        else:
+            self.fetch_page(forward=False)
+    
+    def prefetch(self):
+        # Соседняя страница загружается заранее, когда до края загруженных строк меньше половины страницы
+        if self.loading or not self.buffer:
+            return
+        buffer_end = self.buffer_start + len(self.buffer)
+        if buffer_end - (self.top + self.visible_rows) < self.page_size // 2 and buffer_end < self.total_count:
+            self.fetch_page(forward=True)
+        elif self.top - self.buffer_start < self.page_size // 2 and self.buffer_start > 0:
+            self.fetch_page(forward=False)
+    
+    def render_window(self):
+        # Элементы таблицы переиспользуются: меняются только значения видимых строк
+        start = self.top - self.buffer_start
+        rows = self.buffer[start:start + self.visible_rows]
+        items = self.tree.get_children()
+        selected = ()
+        for i, row in enumerate(rows):
+            if i < len(items):
+                item = items[i]
+                self.tree.item(item, values=row, tags=(row[3],))
+            else:
+                item = self.tree.insert("", "end", values=row, tags=(row[3],))
+            if row[0] == self.selected_id:
+                selected = (item,)
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        
+        # Выделение следует за предложением, а не за строкой таблицы
+        if tuple(self.tree.selection()) != selected:
+            self.tree.selection_set(selected)
+        
+        if rows:
+            self.count_label.config(text=f"Строки {self.top + 1}–{self.top + len(rows)} из {self.total_count}")
+        else:
+            self.count_label.config(text="Предложений нет")
+    
+    def update_scrollbar(self):
+        if self.total_count:
+            first = self.top / self.total_count
+            last = min(1.0, (self.top + self.visible_rows) / self.total_count)
+        else:
+            first, last = 0.0, 1.0
+        self.v_scrollbar.set(first, last)
+    
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total_count))
+        else:
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.top + int(amount) * step)
+    
+    def on_mouse_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.top - 3)
+        else:
+            self.scroll_to(self.top + 3)
+        return "break"
+    
+    def on_tree_resize(self, event):
+        # Число видимых строк по высоте таблицы (без строки заголовков)
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible_rows = max(1, (event.height - row_height - 4) // row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.scroll_to(self.top)
+    
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.selected_id = self.tree.item(selection[0])['values'][0]
     
     def add_proposal(self):
         AddProposalForm(self.root, self)
@@ -121,12 +481,13 @@ class MainForm:
         
         item = self.tree.item(selected_item[0])
         proposal_id = item['values'][0]
-        DetailsForm(self.root, proposal_id, self.db)
+        DetailsForm(self.root, proposal_id, self.db, self.executor)
     
     def generate_report(self):
-        ReportForm(self.root, self.db)
+        ReportForm(self.root, self.db, self.executor, self.statistics)
     
     def on_closing(self):
+        self.executor.shutdown()
         if self.db:
             self.db.close()
         self.root.destroy()
@@ -137,12 +498,14 @@ class AddProposalForm:
         self.parent = parent
         self.main_form = main_form
         self.db = main_form.db
+        self.executor = main_form.executor
         
         self.window = tk.Toplevel(parent)
         self.window.title("Добавление нового предложения")
         self.window.geometry("500x450")
         self.window.transient(parent)
         self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
         
         self.setup_ui()
     
@@ -195,10 +558,11 @@ class AddProposalForm:
         button_frame = tk.Frame(self.window)
         button_frame.pack(pady=20)
         
-        tk.Button(button_frame, text="Сохранить", width=15, bg="#4CAF50", fg="white",
-                 command=self.save_proposal).pack(side=tk.LEFT, padx=10)
+        self.save_button = tk.Button(button_frame, text="Сохранить", width=15, bg="#4CAF50", fg="white",
+                                     command=self.save_proposal)
+        self.save_button.pack(side=tk.LEFT, padx=10)
         tk.Button(button_frame, text="Отмена", width=15, bg="#f44336", fg="white",
-                 command=self.window.destroy).pack(side=tk.LEFT, padx=10)
+                 command=self.close).pack(side=tk.LEFT, padx=10)
     
     def save_proposal(self):
         try:
@@ -242,26 +606,55 @@ class AddProposalForm:
             params = (department, proposal_text, priority, cost_value, 
                      justification, date_for_db)
             
-            if self.db.execute_query(query, params):
-                messagebox.showinfo("Успех", "Предложение успешно добавлено!")
-                self.window.destroy()
-                self.main_form.load_proposals()
+            # Запись выполняется в фоне; повторное нажатие до ответа базы не допускается
+            self.save_button.config(state="disabled")
+            self.executor.submit(self.insert_proposal, query, params, priority,
+                                 on_done=self.on_saved, on_error=self.on_save_error, owner=self)
             
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка при сохранении: {str(e)}")
+    
+    def insert_proposal(self, query, params, priority):
+        """Запись предложения и журнала в одной транзакции (выполняется в фоновом потоке)"""
+        # При ошибке изменения откатываются
+        with self.db.transaction():
+            proposal_id = self.db.run(query, params, False).lastrowid
+            self.db.run(CHANGE_LOG_INSERT, (proposal_id, priority, 'insert'), False)
+        return proposal_id
+    
+    def on_saved(self, proposal_id):
+        self.main_form.statistics.invalidate()
+        
+        messagebox.showinfo("Успех", "Предложение успешно добавлено!")
+        self.window.destroy()
+        self.main_form.add_row(proposal_id)
+    
+    def on_save_error(self, error):
+        self.save_button.config(state="normal")
+        messagebox.showerror("Ошибка", f"Ошибка при сохранении: {error}")
+    
+    def close(self):
+        # Ответ на начатое сохранение окну уже не нужен: строка придет в список из журнала изменений
+        self.executor.cancel(self)
+        self.window.destroy()
 
 
 class DetailsForm:
-    def __init__(self, parent, proposal_id, db):
+    def __init__(self, parent, proposal_id, db, executor):
         self.parent = parent
         self.proposal_id = proposal_id
         self.db = db
+        self.executor = executor
         
         self.window = tk.Toplevel(parent)
         self.window.title(f"Детали предложения #{proposal_id}")
         self.window.geometry("500x400")
         self.window.transient(parent)
         self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.loading_label = tk.Label(self.window, text="Загрузка...", font=("Arial", 10), fg="gray")
+        self.loading_label.pack(pady=20)
         
         self.load_details()
     
@@ -270,7 +663,20 @@ class DetailsForm:
                           justification, implementation_date 
                    FROM proposal WHERE id = %s"""
         
-        result = self.db.fetch_all(query, (self.proposal_id,))
+        self.executor.submit(self.db.run, query, (self.proposal_id,), True,
+                             on_done=self.show_details, on_error=self.on_load_error, owner=self)
+    
+    def on_load_error(self, error):
+        messagebox.showerror("Ошибка", f"Ошибка выполнения запроса: {error}")
+        self.close()
+    
+    def close(self):
+        # Незавершенные запросы окна отменяются
+        self.executor.cancel(self)
+        self.window.destroy()
+    
+    def show_details(self, result):
+        self.loading_label.destroy()
         
         if not result:
             messagebox.showerror("Ошибка", "Предложение не найдено")
@@ -322,38 +728,85 @@ class DetailsForm:
         
         # Кнопка закрытия
         tk.Button(self.window, text="Закрыть", width=15, 
-                 command=self.window.destroy, bg="#2196F3", fg="white").pack(pady=10)
+                 command=self.close, bg="#2196F3", fg="white").pack(pady=10)
+
+
+class ProposalStatistics:
+    """Сводка по предложениям: считается одним запросом и хранится до записи в таблицу proposal"""
+    
+    def __init__(self, db):
+        self.db = db
+        self.values = None  # (всего, высокоприоритетных, общая стоимость)
+        self.generation = 0  # меняется при каждом сбросе
+    
+    def get(self):
+        """Сводка из кэша или из базы (можно вызывать из фонового потока)"""
+        values = self.values
+        if values is None:
+            generation = self.generation
+            # Сводка хранится только здесь, поэтому читается мимо кэша запросов
+            total, high_priority, total_cost = self.db.run(STATISTICS_QUERY, None, True, cached=False)[0]
+            values = (total, int(high_priority), float(total_cost))
+            if generation == self.generation:
+                # Результат, прочитанный одновременно с записью, не сохраняется
+                self.values = values
+        return values
+    
+    def invalidate(self):
+        """Сброс после изменения предложений"""
+        self.generation += 1
+        self.values = None
 
 
 class ReportForm:
-    def __init__(self, parent, db):
+    def __init__(self, parent, db, executor, statistics):
         self.parent = parent
         self.db = db
+        self.executor = executor
+        self.statistics = statistics
         
         self.window = tk.Toplevel(parent)
         self.window.title("Отчет по предложениям")
         self.window.geometry("700x600")
         self.window.transient(parent)
         self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.loading_label = tk.Label(self.window, text="Формирование отчета...", font=("Arial", 10), fg="gray")
+        self.loading_label.pack(pady=20)
         
         self.generate_report()
     
     def generate_report(self):
-        # Получение статистики
-        total_query = "SELECT COUNT(*) FROM proposal"
-        high_priority_query = "SELECT COUNT(*) FROM proposal WHERE priority = 'Высокий'"
-        cost_query = "SELECT SUM(cost) FROM proposal"
-        
-        total = self.db.fetch_all(total_query)[0][0]
-        high_priority = self.db.fetch_all(high_priority_query)[0][0]
-        total_cost = self.db.fetch_all(cost_query)[0][0] or 0
+        # Запросы отчета выполняются в фоне одной задачей
+        self.executor.submit(self.fetch_report_data, on_done=self.show_report,
+                             on_error=self.on_load_error, owner=self)
+    
+    def fetch_report_data(self):
+        """Статистика и список предложений (выполняется в фоновом потоке)"""
+        # Получение статистики (из кэша, если предложения не менялись)
+        total, high_priority, total_cost = self.statistics.get()
         
         # Получение всех предложений
         proposals_query = """SELECT id, department, proposal, priority, cost, 
                                     justification, implementation_date 
                              FROM proposal 
                              ORDER BY FIELD(priority, 'Высокий', 'Средний', 'Низкий') DESC, id"""
-        proposals = self.db.fetch_all(proposals_query)
+        proposals = self.db.run(proposals_query, None, True)
+        return total, high_priority, total_cost, proposals
+    
+    def on_load_error(self, error):
+        messagebox.showerror("Ошибка", f"Не удалось сформировать отчет: {error}")
+        self.close()
+    
+    def close(self):
+        # Незавершенные запросы окна отменяются
+        self.executor.cancel(self)
+        self.window.destroy()
+    
+    def show_report(self, data):
+        total, high_priority, total_cost, proposals = data
+        self.loading_label.destroy()
         
         # Создание текста отчета
         report_text = f"""ОТЧЕТ ПО ПРЕДЛОЖЕНИЯМ О РАСШИРЕНИИ ИС
@@ -381,6 +834,9 @@ class ReportForm:
 """
         
         self.report_text = report_text  # Сохраняем текст для печати
+        # Данные отчета для печати (без повторных запросов)
+        self.summary = (total, high_priority, total_cost)
+        self.proposals = proposals
         
         # Фрейм для текста отчета
         text_frame = tk.Frame(self.window)
@@ -413,7 +869,7 @@ class ReportForm:
         
         # Кнопка закрытия
         tk.Button(button_frame, text="Закрыть", width=15, bg="#f44336", fg="white",
-                 command=self.window.destroy, font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
+                 command=self.close, font=("Arial", 10)).pack(side=tk.LEFT, padx=5)
     
     def save_to_file(self):
         """Сохранить отчет в текстовый файл"""
@@ -493,11 +949,8 @@ class ReportForm:
     
     def create_html_for_printing(self):
         """Создать HTML контент для печати"""
-        proposals_query = """SELECT id, department, proposal, priority, cost, 
-                                    justification, implementation_date 
-                             FROM proposal 
-                             ORDER BY FIELD(priority, 'Высокий', 'Средний', 'Низкий') DESC, id"""
-        proposals = self.db.fetch_all(proposals_query)
+        # Печатается тот же список, что показан в отчете
+        proposals = self.proposals
         
         # Генерируем HTML таблицу с предложениями
         proposals_html = ""
@@ -665,13 +1118,13 @@ class ReportForm:
     
     def get_statistic(self, stat_type):
         """Получить статистику для отчета"""
+        total, high_priority, total_cost = self.summary
         if stat_type == "total":
-            return self.db.fetch_all("SELECT COUNT(*) FROM proposal")[0][0]
+            return total
         elif stat_type == "high_priority":
-            return self.db.fetch_all("SELECT COUNT(*) FROM proposal WHERE priority = 'Высокий'")[0][0]
+            return high_priority
         elif stat_type == "total_cost":
-            cost = self.db.fetch_all("SELECT SUM(cost) FROM proposal")[0][0]
-            return float(cost) if cost else 0.0
+            return total_cost
         return 0
 
 def main():
@@ -0,0 +1,93 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import tkinter.messagebox as messagebox
+
+
+class QueryExecutor:
+    """Выполнение запросов к базе в фоновых потоках, чтобы окно не зависало
+
+    Каждая задача возвращает Future. Готовые результаты собираются в очередь и
+    передаются формам в потоке Tk через root.after, поэтому обработчики могут
+    свободно работать с виджетами.
+    """
+    
+    def __init__(self, root, workers=2, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self.done = queue.Queue()  # завершенные задачи (заполняется рабочими потоками)
+        self.pending = {}  # Future -> (владелец, обработчик результата, обработчик ошибки)
+        self.cancelled = set()  # задачи закрытых окон, которые еще выполняются
+        self.busy_listeners = []
+        self.shown_busy = 0
+        self.polling = False
+    
+    def submit(self, function, *args, on_done=None, on_error=None, owner=None):
+        """Запуск function(*args) в фоновом потоке; on_done(результат) вызывается в потоке Tk"""
+        future = self.threads.submit(function, *args)
+        self.pending[future] = (owner, on_done, on_error)
+        future.add_done_callback(self.done.put)
+        self.notify_busy()
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self.poll)
+        return future
+    
+    def cancel(self, owner):
+        """Отмена задач владельца (например, при закрытии окна): результаты не доставляются"""
+        for future, (future_owner, _, _) in list(self.pending.items()):
+            if future_owner is owner:
+                # Еще не начатая задача не выполняется, выполняющаяся завершится без обработчиков
+                future.cancel()
+                self.cancelled.add(future)
+    
+    def poll(self):
+        """Доставка готовых результатов формам (в потоке Tk)"""
+        while True:
+            try:
+                future = self.done.get_nowait()
+            except queue.Empty:
+                break
+            owner, on_done, on_error = self.pending.pop(future, (None, None, None))
+            if future.cancelled() or future in self.cancelled:
+                self.cancelled.discard(future)
+                continue
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    messagebox.showerror("Ошибка", f"Ошибка выполнения запроса: {error}")
+            elif on_done:
+                on_done(future.result())
+        
+        self.notify_busy()
+        if self.pending:
+            self.root.after(self.poll_ms, self.poll)
+        else:
+            self.polling = False
+    
+    def busy(self):
+        """Число невыполненных задач"""
+        return len(self.pending)
+    
+    def add_busy_listener(self, callback):
+        """Подписка на изменение числа невыполненных задач (индикатор занятости)"""
+        self.busy_listeners.append(callback)
+    
+    def notify_busy(self):
+        """Оповещение индикаторов занятости (только при изменении числа задач)"""
+        count = len(self.pending)
+        if count == self.shown_busy:
+            return
+        self.shown_busy = count
+        for callback in self.busy_listeners:
+            callback(count)
+    
+    def shutdown(self):
+        """Остановка потоков: невыполненные задачи отменяются"""
+        for future in list(self.pending):
+            future.cancel()
+        self.pending.clear()
+        self.cancelled.clear()
+        self.threads.shutdown(wait=False, cancel_futures=True)
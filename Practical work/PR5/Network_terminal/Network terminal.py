@@ -1,47 +1,90 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext
+from tkinter import ttk, scrolledtext, filedialog
 import random
-import threading
 import time
+import argparse
+import multiprocessing
+import os
+import queue
+from collections import deque
 from datetime import datetime
-from queue import Queue
+import numpy as np
+from event_scheduler import EventScheduler
+from packet_renderer import PacketRenderer
+from log_sink import ConsoleLogSink
+from packet_store import PacketStore
+from routing import NetworkTopology
+from topology_loader import load_topology, topology_bounds
+from viewport import Viewport, SpatialGrid
+from metrics import MetricsRegistry, LatencyHistogram
+from traffic import ConstantArrivals, ARRIVAL_MODELS, create_arrival_process
+from capture import CaptureWriter, CaptureReader
+from switching import LearningSwitch
+from session_log import SessionLog
+from trace_export import ChromeTraceWriter, CATEGORY_ANIMATION
+from sharding import (ShardChannels, ShardStats, STAT_FIELDS, partition_topology,
+                      cross_shard_lookahead, cross_shard_reach)
+
+# Скорости воспроизведения записи (0 - максимально быстро)
+REPLAY_SPEEDS = {"1x": 1.0, "10x": 10.0, "100x": 100.0, "макс.": 0}
+
+# Число пакетов в пути, выше которого пакеты не рисуются по отдельности
+DEFAULT_LOD_THRESHOLD = 400
+
+# Цвета каналов в обобщенном виде по загрузке (верхняя граница доли занятости -> цвет)
+FLOW_COLORS = [(0.0, '#4A4E69'), (0.3, '#06D6A0'), (0.7, '#FFD166'), (1.0, '#EF476F')]
+
+# Емкость буфера устройства по умолчанию, пакетов
+DEFAULT_DEVICE_BUFFER = 32
+
+# Каталог журнала сессии в интерфейсе - рядом с программой, а не в текущем каталоге
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+
+# Палитра цветов пакетов (в пакете хранится только индекс цвета)
+PACKET_COLORS = ['#FF6B6B', '#4ECDC4', '#FFD166', '#06D6A0',
+                 '#118AB2', '#EF476F', '#7209B7', '#F15BB5']
 
 class NetworkPacket:
-    """Класс для представления сетевого пакета"""
-    def __init__(self, packet_id, source, destination, size):
+    """Класс для представления сетевого пакета в пути"""
+    __slots__ = ('id', 'source', 'destination', 'size', 'color_index',
+                 'sent_ns', 'delivered_ns', 'delay')
+    
+    def __init__(self, packet_id, source, destination, size, sent_ns):
         self.id = packet_id
-        self.source = source
-        self.destination = destination
+        self.source = source  # индекс устройства-источника
+        self.destination = destination  # индекс устройства-получателя
         self.size = size
-        self.timestamp = datetime.now()
-        self.sent_time = None
-        self.delivered_time = None
+        self.sent_ns = sent_ns  # монотонное время отправки, нс
+        self.delivered_ns = 0
         self.delay = 0
-        self.path = []
-        self.color = self.generate_color()
+        self.color_index = self.generate_color()
+    
+    @property
+    def color(self):
+        """Цвет пакета"""
+        return PACKET_COLORS[self.color_index]
     
     def generate_color(self):
         """Генерация случайного цвета для пакета"""
-        colors = ['#FF6B6B', '#4ECDC4', '#FFD166', '#06D6A0', 
-                  '#118AB2', '#EF476F', '#7209B7', '#F15BB5']
-        return random.choice(colors)
+        return random.randrange(len(PACKET_COLORS))
     
     def calculate_delay(self):
         """Расчет задержки доставки"""
-        if self.sent_time and self.delivered_time:
-            self.delay = int((self.delivered_time - self.sent_time).total_seconds() * 1000)
+        if self.delivered_ns:
+            self.delay = (self.delivered_ns - self.sent_ns) // 1_000_000
         return self.delay
 
 class NetworkDevice:
     """Класс для представления сетевого устройства"""
-    def __init__(self, name, device_type, x, y):
+    def __init__(self, name, device_type, x, y, buffer_capacity=DEFAULT_DEVICE_BUFFER):
         self.name = name
         self.type = device_type  # 'pc' или 'switch'
         self.x = x
         self.y = y
         self.connected_to = []
         self.status = 'idle'  # idle, sending, receiving, processing
-        self.packets = []
+        self.packets = deque()  # отправленные пакеты, еще не доставленные и не отброшенные
+        self.buffer_capacity = buffer_capacity
         self.indicator_color = '#2D3047'
         self.base_color = '#6C757D' if device_type == 'pc' else '#118AB2'
         
@@ -49,6 +92,18 @@ class NetworkDevice:
         """Добавление соединения с другим устройством"""
         self.connected_to.append(device)
     
+    def buffer_full(self):
+        """Буфер заполнен - новые пакеты не отправляются"""
+        return len(self.packets) >= self.buffer_capacity
+    
+    def release_packet(self, packet):
+        """Освобождение места в буфере (пакет доставлен или отброшен)"""
+        # Пакеты покидают буфер почти по порядку, поэтому поиск от начала короткий
+        try:
+            self.packets.remove(packet)
+        except ValueError:
+            pass
+    
     def update_status(self, status):
         """Обновление статуса устройства"""
         self.status = status
@@ -61,37 +116,75 @@ class NetworkDevice:
         else:
             self.indicator_color = '#2D3047'
 
-class NetworkTerminal:
-    """Основной класс приложения сетевого терминала"""
+class NetworkSimulation:
+    """Модель ЛВС: генерация и доставка пакетов через планировщик событий"""
     
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Сетевой терминал - Имитация ЛВС")
-        self.root.geometry("1400x800")
-        self.root.configure(bg='#1A1A2E')
-        
+    def __init__(self, scheduler, topology=None, traffic=None):
         # Переменные управления
         self.running = False
         self.packets_per_second = 3
         self.packet_counter = 0
         self.total_packets = 0
         self.active_packets = []
-        self.message_queue = Queue()
         self.stop_requested = False  # Флаг для запроса остановки
-        
-        # Создание сетевых устройств
-        self.devices = self.create_network_devices()
-        
-        # Создание интерфейса
-        self.setup_ui()
-        
-        # Запуск потоков
-        self.start_animation_thread()
-        self.start_log_thread()
-        
+        self.log_enabled = True
+        self.session_log = None  # SessionLog - копия журнала на диске
+        
+        # Планировщик событий жизненного цикла пакетов
+        self.scheduler = scheduler
+        
+        # Привязка монотонного времени модели к календарному (для журнала)
+        self.wall_offset_ns = time.time_ns() - self.clock_ns()
+        
+        # История доставленных пакетов
+        self.packet_store = PacketStore()
+        self.dropped_packets = 0
+        self.flood_copies = 0  # копии рассылки коммутаторов, переданные в каналы
+        self.flood_drops = 0  # копии рассылки, не поместившиеся в очередь порта
+        
+        # Гистограммы задержек и пропускная способность (запись за O(1))
+        self.metrics = MetricsRegistry()
+        
+        # Время обработки пакета коммутатором перед постановкой в выходной порт, с
+        self.switch_processing_s = 0.00005
+        
+        # Процесс поступления пакетов (интервалы и размеры генерируются блоками)
+        self.traffic = traffic or ConstantArrivals(self.packets_per_second)
+        self.packets_per_second = self.traffic.rate
+        self.next_arrival_time = 0.0  # плановый момент следующей генерации, с
+        self.generation_event = None
+        
+        # Обратное давление: при заполненном буфере источника интервал генерации
+        # увеличивается вдвое (до max_backoff раз), после успешной отправки сбрасывается
+        self.backpressure_skips = 0
+        self.backoff = 1
+        self.max_backoff = 16
+        
+        # Запись потока пакетов и воспроизведение записи
+        self.capture = None  # CaptureWriter во время записи
+        self.replay = None  # CaptureReader во время воспроизведения
+        self.replay_source = None  # путь последней воспроизведенной записи
+        self.replay_records = None
+        self.replay_event = None
+        self.replay_speed = 1.0  # 0 - максимально быстро
+        self.replay_batch = 256  # пакетов за событие при максимальной скорости
+        
+        # Трасса жизненного цикла пакетов для Perfetto (ChromeTraceWriter во время записи)
+        self.trace = None
+        
+        # Создание сетевых устройств и реестра с таблицами маршрутизации
+        self.topology = topology or self.create_network_devices()
+        self.devices = self.topology.devices
+        self.host_indices = self.topology.hosts()
+        self.source_indices = self.host_indices  # компьютеры, генерирующие пакеты
+        
+        # Таблицы коммутации: индекс коммутатора -> LearningSwitch (порты - индексы соседей)
+        self.switches = {index: LearningSwitch(self.topology.adjacency[index])
+                         for index, device in enumerate(self.devices) if device.type == 'switch'}
+    
     def create_network_devices(self):
         """Создание сетевых устройств"""
-        devices = []
+        topology = NetworkTopology()
         
         # Создание компьютеров
         pc1 = NetworkDevice('ПК1', 'pc', 100, 100)
@@ -102,15 +195,471 @@ class NetworkTerminal:
         # Создание коммутатора
         switch = NetworkDevice('SWITCH', 'switch', 650, 350)
         
-        devices.extend([pc1, pc2, pc3, pc4, switch])
+        for device in [pc1, pc2, pc3, pc4, switch]:
+            topology.add_device(device)
         
         # Создание соединений (каждый ПК подключен к коммутатору)
         for pc in [pc1, pc2, pc3, pc4]:
-            pc.add_connection(switch)
-            switch.add_connection(pc)
+            topology.add_link(pc.name, switch.name)
+        
+        return topology
+    
+    def log_message(self, message, time_ns=None):
+        """Добавление сообщения в журнал (time_ns - время события модели, форматируется потребителем)"""
+        if self.session_log:
+            self.session_log.put(time_ns, message)
+    
+    def start_session_log(self, directory):
+        """Включение записи журнала в файлы с ротацией"""
+        self.session_log = SessionLog(directory, self.format_time)
+    
+    def clock_ns(self):
+        """Текущее время модели (монотонное), нс"""
+        return int(self.scheduler.now() * 1_000_000_000)
+    
+    def format_time(self, time_ns):
+        """Форматирование времени модели для журнала"""
+        return datetime.fromtimestamp((self.wall_offset_ns + time_ns) / 1e9).strftime("%H:%M:%S.%f")[:-3]
+    
+    def generate_packet(self, size=None, source=None, destination=None, force=False):
+        """Генерация случайного пакета (force - без проверки буфера источника)"""
+        if not self.running or self.stop_requested:
+            return None
+        
+        # Случайный выбор источника и получателя (индексы устройств),
+        # при воспроизведении записи они заданы
+        if source is None:
+            sources = self.source_indices
+            destinations = self.host_indices
+            
+            source = random.choice(sources)
+            # Исключаем возможность отправки пакета самому себе
+            # (повторный выбор вместо построения списка - важно для тысяч узлов)
+            destination = random.choice(destinations)
+            while destination == source and len(destinations) > 1:
+                destination = random.choice(destinations)
+        
+        # Источник с заполненным буфером не отправляет новых пакетов
+        device = self.devices[source]
+        if not force and len(device.packets) >= device.buffer_capacity:
+            self.backpressure_skips += 1
+            return None
+        
+        self.packet_counter += 1
+        self.total_packets += 1
+        
+        # Случайный размер пакета (если не задан процессом поступления)
+        if size is None:
+            size = random.randint(100, 1500)
         
-        return devices
+        packet = NetworkPacket(self.packet_counter, source, destination, size, self.clock_ns())
+        device.packets.append(packet)
+        
+        if self.capture:
+            self.capture.record(self.scheduler.now(), source, destination, size)
+        if self.trace:
+            self.trace.instant(source, "создание", packet.id, self.scheduler.now())
+        
+        # Логирование создания пакета
+        if self.log_enabled:
+            self.log_message(f"Пакет #{packet.id}: {self.devices[source].name} -> "
+                             f"{self.devices[destination].name}, Размер: {packet.size} байт",
+                             packet.sent_ns)
+        
+        return packet
+    
+    def simulate_delivery(self, packet):
+        """Симуляция доставки пакета"""
+        # Проверяем флаг остановки
+        if self.stop_requested:
+            return
+        
+        # Маршрут берется из кэшированной таблицы продвижения
+        path = self.topology.path(packet.source, packet.destination)
+        if path is None:
+            self.devices[packet.source].release_packet(packet)
+            self.log_message(f"Пакет #{packet.id}: нет маршрута до {self.devices[packet.destination].name}")
+            return
+        
+        # Задержка складывается из очереди, передачи и распространения на каждом канале
+        self.forward_packet(packet, path, 0, self.scheduler.now())
+    
+    def forward_packet(self, packet, path, hop, ready_time):
+        """Постановка пакета в очередь выходного порта узла path[hop]"""
+        port = self.topology.ports[(path[hop], path[hop + 1])]
+        departure = port.enqueue(ready_time, packet.size)
+        if departure is None:
+            self.on_packet_dropped(packet, path[hop], path[hop + 1])
+            return
+        
+        if self.trace:
+            # Ожидание в очереди выходного порта и передача в канал
+            name = "очередь источника" if hop == 0 else "очередь порта"
+            self.trace.span(path[hop], name, packet.id, ready_time, departure)
+        self.schedule_arrival(packet, path, hop + 1, departure + port.link.propagation_s)
+    
+    def schedule_arrival(self, packet, path, hop, when):
+        """Планирование прибытия пакета на устройство path[hop] в момент when"""
+        if hop + 1 == len(path):
+            self.scheduler.schedule_at(when, self.on_packet_delivered, packet)
+        else:
+            self.scheduler.schedule_at(when, self.on_switch_reached, packet, path, hop)
+    
+    def on_switch_reached(self, packet, path, hop):
+        """Событие прохождения пакетом коммутатора"""
+        # Обучение по адресу источника и поиск порта получателя в таблице коммутации
+        node = path[hop]
+        now = self.scheduler.now()
+        ready = now + self.switch_processing_s
+        switch = self.switches.get(node)
+        out_port = None
+        if switch is not None:
+            out_port = switch.forward(packet.source, packet.destination, path[hop - 1], packet.size, now)
+            if out_port is None:
+                # Рассылка: пакет продолжает путь по маршруту (копия, дошедшая до получателя),
+                # копии в остальные порты занимают каналы и очереди портов
+                self.flood(node, packet.source, packet.size, ready, (path[hop - 1], path[hop + 1]))
+            elif out_port != path[hop + 1]:
+                path = self.learned_path(path, hop, out_port)
+        
+        if self.log_enabled:
+            action = "рассылка" if out_port is None else f"порт {self.devices[out_port].name}"
+            self.log_message(f"Пакет #{packet.id} достиг {self.devices[node].name} ({action})",
+                             self.clock_ns())
+        
+        # Пакет уходит в выходной порт после обработки коммутатором
+        if self.trace:
+            self.trace.span(node, "обработка", packet.id, now, ready)
+        self.forward_packet(packet, path, hop, ready)
+    
+    def learned_path(self, path, hop, out_port):
+        """Маршрут через порт из таблицы коммутации (порт расходится с маршрутом в сети с циклами)"""
+        # Дальше пакет идет по кратчайшему маршруту; маршрут, возвращающийся
+        # в пройденные узлы, не используется - иначе пакет мог бы зациклиться
+        tail = self.topology.path(out_port, path[-1])
+        if tail is None or any(node in path[:hop + 1] for node in tail):
+            return path
+        return path[:hop + 1] + tail
+    
+    def flood(self, node, source, size, ready, exclude):
+        """Копии кадра рассылки в остальные порты коммутатора node"""
+        # Копии занимают каналы и очереди портов рассылающего коммутатора. Соседний
+        # коммутатор только запоминает источник и не рассылает копию дальше: пакет
+        # к получателю уже идет по маршруту, а повторная рассылка по всей сети
+        # на каждом неизвестном адресе делала бы крупные топологии неподъемными
+        for neighbor in self.topology.adjacency[node]:
+            if neighbor in exclude:
+                continue
+            port = self.topology.ports[(node, neighbor)]
+            departure = port.enqueue(ready, size)
+            if departure is None:
+                self.flood_drops += 1
+                continue
+            self.flood_copies += 1
+            # Компьютер отбрасывает чужой кадр - событие прибытия нужно только коммутатору
+            if neighbor in self.switches:
+                self.schedule_flood_copy(node, neighbor, source, departure + port.link.propagation_s)
+    
+    def schedule_flood_copy(self, previous, node, source, when):
+        """Планирование прибытия копии рассылки на коммутатор node"""
+        self.scheduler.schedule_at(when, self.on_flood_copy, previous, node, source)
+    
+    def on_flood_copy(self, previous, node, source):
+        """Копия рассылки дошла до коммутатора: источник запоминается за портом previous"""
+        self.switches[node].learn(source, previous, self.scheduler.now())
+    
+    def on_packet_dropped(self, packet, from_index, to_index):
+        """Пакет отброшен: очередь выходного порта переполнена"""
+        self.devices[packet.source].release_packet(packet)
+        self.dropped_packets += 1
+        self.metrics.record_drop()
+        if self.trace:
+            self.trace.instant(from_index, "отброшен", packet.id, self.scheduler.now())
+        if self.log_enabled:
+            self.log_message(f"Пакет #{packet.id} отброшен: очередь порта "
+                             f"{self.devices[from_index].name} -> {self.devices[to_index].name} переполнена",
+                             self.clock_ns())
+    
+    def on_packet_delivered(self, packet):
+        """Событие доставки пакета получателю"""
+        packet.delivered_ns = self.clock_ns()
+        packet.calculate_delay()
+        self.devices[packet.source].release_packet(packet)
+        self.packet_store.append(packet)
+        self.metrics.record_delivery(packet.source, packet.destination,
+                                     packet.delivered_ns - packet.sent_ns, packet.size,
+                                     self.scheduler.now())
+        if self.trace:
+            self.trace.instant(packet.destination, "доставка", packet.id, self.scheduler.now())
+        
+        # Логирование доставки
+        if self.log_enabled:
+            self.log_message(f"Пакет #{packet.id} доставлен на "
+                             f"{self.devices[packet.destination].name} (задержка: {packet.delay} мс)",
+                             packet.delivered_ns)
+    
+    def animate_packet(self, packet):
+        """Визуализация пакета (в модели без интерфейса отсутствует)"""
+        pass
+    
+    def buffer_occupancy(self, index):
+        """Заполненность буфера устройства, 0..1 (у коммутатора - очередей его выходных портов)"""
+        device = self.devices[index]
+        if device.type == 'pc':
+            return min(1.0, len(device.packets) / device.buffer_capacity)
+        now = self.scheduler.now()
+        ports = [self.topology.ports[(index, neighbor)] for neighbor in self.topology.adjacency[index]]
+        capacity = sum(port.link.buffer_packets for port in ports)
+        if not capacity:
+            return 0.0
+        return min(1.0, sum(port.queue_depth(now) for port in ports) / capacity)
+    
+    def set_device_buffers(self, capacity):
+        """Одинаковая емкость буфера для всех устройств"""
+        for device in self.devices:
+            device.buffer_capacity = capacity
+    
+    def clear_device_buffers(self):
+        """Очистка буферов устройств (пакеты в пути отменены)"""
+        for device in self.devices:
+            device.packets.clear()
+    
+    def device_name(self, index):
+        """Имя устройства по индексу"""
+        return self.devices[index].name
     
+    def link_statistics(self, limit=None):
+        """Загрузка, глубина очереди и потери по выходным портам (самые загруженные первыми)"""
+        now = self.scheduler.now()
+        rows = []
+        for (a, b), port in self.topology.ports.items():
+            utilization = port.sample(now)
+            if port.packets_sent or port.drops:
+                rows.append((utilization, port.queue_depth(now), port.drops,
+                             self.devices[a].name, self.devices[b].name))
+        rows.sort(reverse=True)
+        return rows[:limit] if limit else rows
+    
+    def switch_statistics(self, limit=None):
+        """Состояние таблиц коммутации (самые нагруженные коммутаторы первыми)"""
+        rows = []
+        for index, switch in self.switches.items():
+            received = sum(counters.rx_packets for counters in switch.ports.values())
+            rows.append((received, len(switch.table), switch.hit_rate(), switch.floods,
+                         switch.aged_out, self.devices[index].name))
+        rows.sort(reverse=True)
+        return rows[:limit] if limit else rows
+    
+    def set_rate(self, rate):
+        """Изменение средней скорости генерации, пакетов/с"""
+        self.packets_per_second = rate
+        self.traffic.set_rate(rate)
+        self.reschedule_generation()
+    
+    def set_traffic(self, traffic):
+        """Замена процесса поступления пакетов"""
+        self.traffic = traffic
+        self.packets_per_second = traffic.rate
+        self.reschedule_generation()
+    
+    def start_generation(self):
+        """Планирование первого события генерации"""
+        self.next_arrival_time = self.scheduler.now()
+        self.generation_event = self.scheduler.schedule_at(self.next_arrival_time, self.generation_tick)
+    
+    def reschedule_generation(self):
+        """Перенос следующей генерации, если при новой скорости она наступает слишком поздно"""
+        if not self.running or self.generation_event is None:
+            return
+        limit = self.scheduler.now() + 1.0 / self.traffic.rate
+        if self.next_arrival_time > limit:
+            self.scheduler.cancel(self.generation_event)
+            self.next_arrival_time = limit
+            self.generation_event = self.scheduler.schedule_at(limit, self.generation_tick)
+    
+    def start_capture(self, path):
+        """Начало записи генерируемых пакетов в файл (дозапись, если файл существует)"""
+        self.stop_capture()
+        self.capture = CaptureWriter(path, len(self.devices))
+        self.log_message(f"Запись пакетов в {path}")
+    
+    def stop_capture(self):
+        """Завершение записи"""
+        if self.capture:
+            self.capture.close()
+            self.log_message(f"Записано пакетов: {self.capture.records_written}")
+            self.capture = None
+    
+    def start_trace(self, path):
+        """Начало записи трассы пакетов в формате Chrome Trace / Perfetto"""
+        self.stop_trace()
+        self.trace = ChromeTraceWriter(path, [device.name for device in self.devices])
+        self.log_message(f"Трасса пакетов в {path}")
+    
+    def stop_trace(self):
+        """Завершение записи трассы"""
+        if self.trace:
+            self.trace.close()
+            self.log_message(f"Записано событий трассы: {self.trace.events_written}")
+            self.trace = None
+    
+    def start_replay(self, path, speed=1.0):
+        """Воспроизведение записи вместо случайной генерации (speed=0 - максимально быстро)"""
+        self.stop_replay()
+        reader = CaptureReader(path)
+        if reader.device_count != len(self.devices):
+            reader.close()
+            raise ValueError("Запись сделана для другой топологии")
+        
+        # На виртуальных часах записанные интервалы не замедляют работу,
+        # поэтому максимальная скорость не меняет временную картину
+        if speed == 0 and self.scheduler.virtual:
+            speed = 1.0
+        self.replay = reader
+        self.replay_source = path
+        self.replay_speed = speed
+        self.replay_records = reader.iter_records()
+        self.replay_start = self.scheduler.now()
+        self.log_message(f"Воспроизведение {path}: {len(reader)} пакетов, "
+                         f"{reader.duration_s():.1f} с, скорость {'макс.' if speed == 0 else f'{speed:g}x'}")
+        
+        record = next(self.replay_records, None)
+        if record is None:
+            self.stop_replay()
+            return
+        self.replay_base_ns = record[0]
+        self.schedule_replay(record)
+    
+    def stop_replay(self):
+        """Завершение воспроизведения"""
+        if self.replay:
+            if self.replay_event:
+                self.scheduler.cancel(self.replay_event)
+            self.replay_records = None
+            self.replay.close()
+            self.replay = None
+    
+    def schedule_replay(self, record):
+        """Планирование генерации записанного пакета"""
+        if self.replay_speed == 0:
+            # Следующая порция - на следующем проходе планировщика
+            self.replay_event = self.scheduler.schedule(0, self.replay_tick, record)
+        else:
+            when = self.replay_start + (record[0] - self.replay_base_ns) / 1e9 / self.replay_speed
+            self.replay_event = self.scheduler.schedule_at(when, self.replay_tick, record)
+    
+    def replay_tick(self, record):
+        """Событие генерации пакета из записи"""
+        if not self.running or self.stop_requested or self.replay_records is None:
+            return
+        
+        records = self.replay_records
+        count = self.replay_batch if self.replay_speed == 0 else 1
+        for _ in range(count):
+            _, source, destination, size = record
+            # Запись воспроизводится полностью: пакеты не отсекаются ограничением буфера
+            packet = self.generate_packet(size, source, destination, force=True)
+            if packet:
+                self.animate_packet(packet)
+                self.simulate_delivery(packet)
+            record = next(records, None)
+            if record is None:
+                self.on_replay_finished()
+                return
+        self.schedule_replay(record)
+    
+    def on_replay_finished(self):
+        """Окончание записи при воспроизведении"""
+        self.log_message(f"Воспроизведение завершено, пакетов: {len(self.replay)}")
+        self.stop_replay()
+    
+    def generation_tick(self):
+        """Событие генерации очередного пакета"""
+        if not self.running or self.stop_requested:
+            return
+        
+        gap, size = self.traffic.next_arrival()
+        packet = self.generate_packet(size)
+        if packet:
+            # Жизненный цикл пакета полностью управляется планировщиком
+            self.animate_packet(packet)
+            self.simulate_delivery(packet)
+            self.backoff = 1
+        else:
+            # Буфер источника заполнен - генерация замедляется, а не копит работу
+            gap *= self.backoff
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+        
+        # Следующая генерация отсчитывается от планового, а не фактического момента,
+        # поэтому задержки таймера не накапливаются и скорость выдерживается точно
+        self.next_arrival_time += gap
+        now = self.scheduler.now()
+        if self.next_arrival_time < now - 1.0:
+            # Отставание больше секунды (интерфейс был занят) - без догоняющего всплеска
+            self.next_arrival_time = now
+        self.generation_event = self.scheduler.schedule_at(self.next_arrival_time, self.generation_tick)
+
+class NetworkTerminal(NetworkSimulation):
+    """Основной класс приложения сетевого терминала"""
+    
+    def __init__(self, root, console_max_lines=2000, topology=None, traffic=None, log_dir=DEFAULT_LOG_DIR,
+                 lod_threshold=DEFAULT_LOD_THRESHOLD):
+        self.root = root
+        self.root.title("Сетевой терминал - Имитация ЛВС")
+        self.root.geometry("1400x800")
+        self.root.configure(bg='#1A1A2E')
+        
+        # Модель сети работает на планировщике реального времени
+        super().__init__(EventScheduler(), topology, traffic)
+        
+        self.scheduler_interval_ms = 10
+        self.segment_duration = 1.0  # Время движения пакета по одному соединению, с
+        self.packet_slots = {}  # id пакета -> слот отрисовщика
+        
+        # Область просмотра: отрисовываются только видимые устройства и соединения
+        self.viewport = Viewport()
+        self.detail_scale = 0.6  # Ниже этого масштаба устройства рисуются упрощенно
+        self.fit_view_pending = topology is not None
+        self.drag_start = None
+        self.buffer_gauges = {}  # индекс устройства -> [фон шкалы, заполнение, показанное значение]
+        
+        # Обобщенный вид при большом числе пакетов: толщина и цвет канала показывают поток.
+        # Возврат к отдельным пакетам - при оценке ниже 3/4 порога (без дребезга)
+        self.lod_threshold = lod_threshold
+        self.flow_view = False
+        self.flow_lifetime = 0.0  # суммарная длительность анимации начатых пакетов, с
+        self.flow_estimate = 0.0  # оценка числа пакетов в пути (формула Литтла)
+        self.flow_sampled_at = 0.0
+        self.link_items = {}  # (a, b) -> линия соединения на холсте
+        self.link_styles = {}  # (a, b) -> (толщина, цвет) в обобщенном виде
+        self.link_counters = [(0, 0.0, 0.0)] * len(self.topology.links)  # пакеты, время передачи по направлениям
+        self.build_spatial_index()
+        
+        # Создание интерфейса
+        self.setup_ui()
+        self.bind_viewport_events()
+        
+        # Покадровая отрисовка пакетов
+        self.renderer = PacketRenderer(self.root, self.canvas, self.scheduler.now,
+                                       viewport=self.viewport)
+        
+        # Пакетный вывод журнала с ограничением числа строк консоли
+        self.log_sink = ConsoleLogSink(self.root, self.console, console_max_lines,
+                                       format_time=self.format_time)
+        
+        # Копия журнала на диске (консоль очищается при сбросе)
+        if log_dir:
+            self.start_session_log(log_dir)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Запуск планировщика, отрисовки и вывода журнала
+        self.start_scheduler()
+        self.renderer.start()
+        self.log_sink.start()
+        self.update_stats_labels()
+        self.update_buffer_gauges()
+        self.update_flow_view()
+        
     def setup_ui(self):
         """Настройка пользовательского интерфейса"""
         # Создание главного фрейма
@@ -202,10 +751,13 @@ class NetworkTerminal:
                               bg='#1F4068', fg='white')
         speed_label.pack(anchor=tk.W)
         
+        # Логарифмическая шкала: 10^-1 .. 10^5 пакетов/с
         self.speed_scale = tk.Scale(
             speed_frame,
-            from_=1,
-            to=10,
+            from_=-1,
+            to=5,
+            resolution=0.1,
+            showvalue=False,
             orient=tk.HORIZONTAL,
             length=100,
             bg='#1F4068',
@@ -214,9 +766,20 @@ class NetworkTerminal:
             highlightbackground='#1F4068',
             command=self.update_speed
         )
-        self.speed_scale.set(self.packets_per_second)
         self.speed_scale.pack()
         
+        self.rate_label = tk.Label(speed_frame, text="", bg='#1F4068', fg='white',
+                                   font=('Consolas', 9))
+        self.rate_label.pack(anchor=tk.W)
+        self.speed_scale.set(np.log10(self.packets_per_second))
+        
+        # Модель потока пакетов
+        self.traffic_model = tk.StringVar(value=self.traffic.name)
+        traffic_combo = ttk.Combobox(speed_frame, textvariable=self.traffic_model,
+                                     values=list(ARRIVAL_MODELS), state='readonly', width=10)
+        traffic_combo.bind("<<ComboboxSelected>>", self.update_traffic_model)
+        traffic_combo.pack(anchor=tk.W, pady=(3, 0))
+        
         # Панель статуса (без счетчика пакетов)
         status_frame = tk.Frame(right_frame, bg='#1A1A2E')
         status_frame.pack(fill=tk.X, padx=10, pady=(5, 10))
@@ -230,6 +793,108 @@ class NetworkTerminal:
         )
         self.status_label.pack(anchor=tk.W)
         
+        # Статистика отрисовки кадров
+        self.render_label = tk.Label(
+            status_frame,
+            text="",
+            font=('Consolas', 8),
+            bg='#1A1A2E',
+            fg='#6C757D'
+        )
+        self.render_label.pack(anchor=tk.W)
+        
+        # Статистика журнала (в том числе отброшенные сообщения)
+        self.log_label = tk.Label(
+            status_frame,
+            text="",
+            font=('Consolas', 8),
+            bg='#1A1A2E',
+            fg='#6C757D'
+        )
+        self.log_label.pack(anchor=tk.W)
+        
+        # Загрузка каналов, очереди портов и потери
+        self.links_label = tk.Label(
+            status_frame,
+            text="",
+            font=('Consolas', 8),
+            bg='#1A1A2E',
+            fg='#6C757D',
+            justify=tk.LEFT
+        )
+        self.links_label.pack(anchor=tk.W)
+        
+        # Панель живых метрик: пропускная способность и задержки
+        self.metrics_label = tk.Label(
+            status_frame,
+            text="",
+            font=('Consolas', 8),
+            bg='#1A1A2E',
+            fg='#4ECDC4',
+            justify=tk.LEFT
+        )
+        self.metrics_label.pack(anchor=tk.W)
+        
+        # Экспорт метрик
+        export_frame = tk.Frame(status_frame, bg='#1A1A2E')
+        export_frame.pack(anchor=tk.W, pady=(5, 0))
+        
+        for text, command in [("CSV", self.export_metrics_csv),
+                              ("Prometheus", self.export_metrics_prometheus)]:
+            tk.Button(
+                export_frame,
+                text=f"Экспорт {text}",
+                command=command,
+                font=('Arial', 8),
+                bg='#118AB2',
+                fg='white',
+                relief=tk.RAISED,
+                bd=1
+            ).pack(side=tk.LEFT, padx=(0, 5))
+        
+        # Запись и воспроизведение потока пакетов
+        capture_frame = tk.Frame(status_frame, bg='#1A1A2E')
+        capture_frame.pack(anchor=tk.W, pady=(5, 0))
+        
+        self.capture_button = tk.Button(
+            capture_frame,
+            text="⏺ Запись",
+            command=self.toggle_capture,
+            font=('Arial', 8),
+            bg='#118AB2',
+            fg='white',
+            relief=tk.RAISED,
+            bd=1
+        )
+        self.capture_button.pack(side=tk.LEFT, padx=(0, 5))
+        
+        tk.Button(
+            capture_frame,
+            text="Воспроизвести",
+            command=self.replay_capture,
+            font=('Arial', 8),
+            bg='#118AB2',
+            fg='white',
+            relief=tk.RAISED,
+            bd=1
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.replay_speed_choice = tk.StringVar(value="1x")
+        ttk.Combobox(capture_frame, textvariable=self.replay_speed_choice,
+                     values=list(REPLAY_SPEEDS), state='readonly', width=6).pack(side=tk.LEFT)
+        
+        self.trace_button = tk.Button(
+            capture_frame,
+            text="⏺ Трасса",
+            command=self.toggle_trace,
+            font=('Arial', 8),
+            bg='#118AB2',
+            fg='white',
+            relief=tk.RAISED,
+            bd=1
+        )
+        self.trace_button.pack(side=tk.LEFT, padx=(5, 0))
+        
         # Отрисовка начального состояния сети
         self.draw_network()
         
@@ -261,77 +926,165 @@ class NetworkTerminal:
             self.console.insert(tk.END, log + "\n")
         self.console.see(tk.END)
     
+    def bind_viewport_events(self):
+        """Панорамирование мышью и масштабирование колесом"""
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
+        self.canvas.bind("<ButtonPress-1>", self.on_drag_start)
+        self.canvas.bind("<B1-Motion>", self.on_drag_move)
+        self.canvas.bind("<ButtonRelease-1>", self.on_drag_end)
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-4>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-5>", self.on_mouse_wheel)
+    
+    def on_canvas_resize(self, event):
+        """Перерисовка при изменении размера холста"""
+        if self.fit_view_pending:
+            self.fit_view_pending = False
+            self.viewport.fit(topology_bounds(self.topology), event.width, event.height)
+        self.draw_network()
+    
+    def on_drag_start(self, event):
+        """Начало панорамирования"""
+        self.drag_start = (event.x, event.y)
+    
+    def on_drag_move(self, event):
+        """Сдвиг уже нарисованных элементов без перерисовки"""
+        if self.drag_start is None:
+            return
+        dx = event.x - self.drag_start[0]
+        dy = event.y - self.drag_start[1]
+        self.drag_start = (event.x, event.y)
+        self.viewport.pan(dx, dy)
+        self.canvas.move("network", dx, dy)
+    
+    def on_drag_end(self, event):
+        """Конец панорамирования: отрисовка открывшейся области"""
+        self.drag_start = None
+        self.draw_network()
+    
+    def on_mouse_wheel(self, event):
+        """Масштабирование относительно курсора"""
+        zoom_in = event.num == 4 or event.delta > 0
+        self.viewport.zoom(1.2 if zoom_in else 1 / 1.2, event.x, event.y)
+        self.draw_network()
+    
+    def build_spatial_index(self):
+        """Пространственный индекс устройств и соединений для отсечения по видимой области"""
+        self.device_grid = SpatialGrid()
+        self.link_grid = SpatialGrid()
+        for index, device in enumerate(self.devices):
+            self.device_grid.insert(index, device.x, device.y, device.x, device.y)
+        for link in self.topology.links:
+            a, b = self.devices[link[0]], self.devices[link[1]]
+            self.link_grid.insert(link, a.x, a.y, b.x, b.y)
+    
+    def visible_area(self):
+        """Видимая часть сети в мировых координатах (с запасом на размеры устройств)"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            width = self.canvas.winfo_reqwidth()
+            height = self.canvas.winfo_reqheight()
+        return self.viewport.visible_rect(width, height, margin=80)
+    
     def draw_network(self):
-        """Отрисовка сетевых устройств и соединений"""
-        self.canvas.delete("all")
-        
-        # Рисование соединений (пунктирные линии)
-        for device in self.devices:
-            if device.type == 'switch':
-                for connected in device.connected_to:
-                    self.canvas.create_line(
-                        device.x, device.y, connected.x, connected.y,
-                        fill='#4A4E69', width=2, dash=(5, 5), tags="connection"
-                    )
+        """Отрисовка видимых сетевых устройств и соединений"""
+        self.canvas.delete("network")
+        self.buffer_gauges = {}
+        self.link_items = {}
+        area = self.visible_area()
+        
+        # Рисование соединений (пунктирные линии, в обобщенном виде - по потоку)
+        for a, b in self.link_grid.query(*area):
+            x0, y0 = self.viewport.to_screen(self.devices[a].x, self.devices[a].y)
+            x1, y1 = self.viewport.to_screen(self.devices[b].x, self.devices[b].y)
+            style = self.link_styles.get((a, b)) if self.flow_view else None
+            if style is None:
+                item = self.canvas.create_line(
+                    x0, y0, x1, y1,
+                    fill='#4A4E69', width=2, dash=(5, 5), tags=("connection", "network")
+                )
+            else:
+                item = self.canvas.create_line(
+                    x0, y0, x1, y1,
+                    fill=style[1], width=style[0], tags=("connection", "network")
+                )
+            self.link_items[(a, b)] = item
         
         # Рисование устройств
-        for device in self.devices:
+        for index in self.device_grid.query(*area):
+            device = self.devices[index]
             if device.type == 'pc':
                 # Компьютеры - прямоугольники с деталями
                 self.draw_pc(device)
             else:
                 # Коммутатор - голубой прямоугольник с портами
                 self.draw_switch(device)
+            if self.viewport.scale >= self.detail_scale:
+                self.draw_buffer_gauge(index)
+        
+        # Пакеты всегда поверх сети
+        self.canvas.tag_raise("packet")
     
     def draw_pc(self, device):
         """Отрисовка компьютера"""
+        x, y = self.viewport.to_screen(device.x, device.y)
+        if self.viewport.scale < self.detail_scale:
+            self.draw_device_marker(device, x, y, 6)
+            return
+        
         # Основной корпус
         self.canvas.create_rectangle(
-            device.x-40, device.y-20, device.x+40, device.y+20,
+            x-40, y-20, x+40, y+20,
             fill=device.base_color, outline='#495057', width=2,
-            tags=f"device_{device.name}"
+            tags=(f"device_{device.name}", "network")
         )
         
         # Индикатор состояния
         self.canvas.create_oval(
-            device.x+25, device.y-15, device.x+35, device.y-5,
+            x+25, y-15, x+35, y-5,
             fill=device.indicator_color, outline='',
-            tags=f"indicator_{device.name}"
+            tags=(f"indicator_{device.name}", "network")
         )
         
         # Экран (прямоугольник внутри)
         self.canvas.create_rectangle(
-            device.x-30, device.y-10, device.x+20, device.y+5,
+            x-30, y-10, x+20, y+5,
             fill='#343A40', outline='#495057', width=1,
-            tags=f"device_{device.name}"
+            tags=(f"device_{device.name}", "network")
         )
         
         # Название устройства
         self.canvas.create_text(
-            device.x, device.y+35,
+            x, y+35,
             text=device.name,
             fill='#E9ECEF',
             font=('Arial', 10, 'bold'),
-            tags=f"label_{device.name}"
+            tags=(f"label_{device.name}", "network")
         )
         
         # Статус под ПК
         status_text = "✓ АКТИВЕН" if device.name == "ПК1" else "✓ ГОТОВ"
         self.canvas.create_text(
-            device.x, device.y-25,
+            x, y-25,
             text=status_text,
             fill='#06D6A0',
             font=('Arial', 9, 'bold'),
-            tags=f"status_{device.name}"
+            tags=(f"status_{device.name}", "network")
         )
     
     def draw_switch(self, device):
         """Отрисовка коммутатора"""
+        x, y = self.viewport.to_screen(device.x, device.y)
+        if self.viewport.scale < self.detail_scale:
+            self.draw_device_marker(device, x, y, 10)
+            return
+        
         # Основной корпус
         self.canvas.create_rectangle(
-            device.x-60, device.y-40, device.x+60, device.y+40,
+            x-60, y-40, x+60, y+40,
             fill=device.base_color, outline='#0D3B66', width=3,
-            tags=f"device_{device.name}"
+            tags=(f"device_{device.name}", "network")
         )
         
         # Индикаторы портов
@@ -342,44 +1095,159 @@ class NetworkTerminal:
         for i, (dx, dy) in enumerate(port_positions):
             color = '#FFD166' if i < 4 else '#2D3047'  # Первые 4 порта активны
             self.canvas.create_oval(
-                device.x+dx-5, device.y+dy-5, device.x+dx+5, device.y+dy+5,
+                x+dx-5, y+dy-5, x+dx+5, y+dy+5,
                 fill=color, outline='#0D3B66', width=1,
-                tags=f"port_{device.name}_{i}"
+                tags=(f"port_{device.name}_{i}", "network")
             )
         
         # Название устройства
         self.canvas.create_text(
-            device.x, device.y+65,
+            x, y+65,
             text=device.name,
             fill='#E9ECEF',
             font=('Arial', 11, 'bold'),
-            tags=f"label_{device.name}"
+            tags=(f"label_{device.name}", "network")
         )
         
         # Статус
         self.canvas.create_text(
-            device.x, device.y-55,
+            x, y-55,
             text="✓ АКТИВЕН",
             fill='#06D6A0',
             font=('Arial', 9, 'bold'),
-            tags=f"status_{device.name}"
+            tags=(f"status_{device.name}", "network")
         )
     
-    def draw_packet(self, packet, x, y):
-        """Отрисовка пакета"""
-        return self.canvas.create_oval(
-            x-15, y-15, x+15, y+15,
-            fill=packet.color, outline='white', width=2,
-            tags=f"packet_{packet.id}"
+    def draw_device_marker(self, device, x, y, size):
+        """Упрощенная отрисовка устройства при малом масштабе"""
+        self.canvas.create_rectangle(
+            x-size, y-size, x+size, y+size,
+            fill=device.base_color, outline='',
+            tags=(f"device_{device.name}", "network")
+        )
+        self.canvas.create_oval(
+            x-size/2, y-size/2, x+size/2, y+size/2,
+            fill=device.indicator_color, outline='',
+            tags=(f"indicator_{device.name}", "network")
         )
     
+    def draw_buffer_gauge(self, index):
+        """Шкала заполненности буфера на корпусе устройства"""
+        device = self.devices[index]
+        x, y = self.viewport.to_screen(device.x, device.y)
+        if device.type == 'pc':
+            x0, y0, x1, y1 = x-30, y+9, x+20, y+14
+        else:
+            x0, y0, x1, y1 = x-50, y+33, x+50, y+37
+        background = self.canvas.create_rectangle(
+            x0, y0, x1, y1,
+            fill='#2D3047', outline='',
+            tags=(f"buffer_{device.name}", "network")
+        )
+        fill = self.canvas.create_rectangle(
+            x0, y0, x0, y1,
+            fill='#06D6A0', outline='',
+            tags=(f"buffer_{device.name}", "network")
+        )
+        gauge = [background, fill, 0.0]
+        self.buffer_gauges[index] = gauge
+        self.set_buffer_gauge(gauge, self.buffer_occupancy(index))
+    
+    def set_buffer_gauge(self, gauge, occupancy):
+        """Перерисовка шкалы буфера (только при изменении показания)"""
+        # Показание округляется до 5%, чтобы не перерисовывать шкалу на каждом пакете
+        occupancy = round(occupancy * 20) / 20
+        if occupancy == gauge[2]:
+            return
+        gauge[2] = occupancy
+        # Координаты берутся у фона: при панорамировании элементы сдвигаются без перерисовки
+        x0, y0, x1, y1 = self.canvas.coords(gauge[0])
+        if occupancy < 0.5:
+            color = '#06D6A0'
+        elif occupancy < 0.9:
+            color = '#FFD166'
+        else:
+            color = '#EF476F'
+        self.canvas.coords(gauge[1], x0, y0, x0 + (x1 - x0) * occupancy, y1)
+        self.canvas.itemconfig(gauge[1], fill=color)
+    
+    def update_buffer_gauges(self):
+        """Обновление шкал буферов видимых устройств четыре раза в секунду"""
+        for index, gauge in self.buffer_gauges.items():
+            self.set_buffer_gauge(gauge, self.buffer_occupancy(index))
+        self.root.after(250, self.update_buffer_gauges)
+    
+    def update_flow_view(self):
+        """Выбор уровня детализации и обновление потоков по каналам два раза в секунду"""
+        now = self.scheduler.now()
+        elapsed = now - self.flow_sampled_at
+        if elapsed > 0:
+            self.flow_estimate = self.flow_lifetime / elapsed
+            self.flow_lifetime = 0.0
+            self.flow_sampled_at = now
+            flows = self.sample_link_flows(elapsed)
+            if not self.flow_view and self.renderer.in_flight() > self.lod_threshold:
+                self.enter_flow_view()
+            elif self.flow_view and self.flow_estimate < self.lod_threshold * 0.75:
+                self.leave_flow_view()
+            if self.flow_view:
+                self.show_link_flows(flows)
+        self.root.after(500, self.update_flow_view)
+    
+    def sample_link_flows(self, elapsed):
+        """Поток (пакетов/с) и загрузка каждого канала с прошлого замера, обе стороны вместе"""
+        flows = {}
+        counters = self.link_counters
+        for i, (link, key) in enumerate(zip(self.topology.link_models, self.topology.links)):
+            forward, backward = link.ports
+            sent = forward.packets_sent + backward.packets_sent
+            last_sent, last_forward, last_backward = counters[i]
+            counters[i] = (sent, forward.busy_time, backward.busy_time)
+            # Загрузка - по более занятому направлению (счетчики обнуляются при сбросе)
+            busy = max(forward.busy_time - last_forward, backward.busy_time - last_backward, 0.0)
+            flows[key] = (max(0, sent - last_sent) / elapsed, min(1.0, busy / elapsed))
+        return flows
+    
+    def show_link_flows(self, flows):
+        """Толщина канала - поток пакетов, цвет - загрузка (меняются только изменившиеся линии)"""
+        for key, (rate, utilization) in flows.items():
+            width = round(2 + min(10.0, 3 * np.log10(1 + rate)))
+            color = next(c for limit, c in FLOW_COLORS if utilization <= limit)
+            style = (width, color)
+            if self.link_styles.get(key) == style:
+                continue
+            self.link_styles[key] = style
+            item = self.link_items.get(key)
+            if item is not None:
+                self.canvas.itemconfig(item, width=width, fill=color, dash=())
+    
+    def enter_flow_view(self):
+        """Переход к обобщенному виду: отдельные пакеты убираются с холста"""
+        self.flow_view = True
+        self.renderer.clear()
+        self.packet_slots.clear()
+        for device in self.devices:
+            device.update_status('idle')
+        self.draw_network()
+        self.log_message(f"Пакетов в пути больше {self.lod_threshold}: обобщенный вид потоков")
+    
+    def leave_flow_view(self):
+        """Возврат к отрисовке отдельных пакетов"""
+        self.flow_view = False
+        self.link_styles = {}
+        self.draw_network()
+        self.log_message("Нагрузка снизилась: отрисовка отдельных пакетов")
+    
+    def packet_lifetime(self, path):
+        """Длительность анимации пакета по маршруту path, с"""
+        hops = len(path) - 1
+        return hops * self.segment_duration + (hops - 1) * 0.3 + 0.5
+    
     def update_device_status(self, device_name, status):
         """Обновление статуса устройства"""
-        for device in self.devices:
-            if device.name == device_name:
-                device.update_status(status)
-                self.canvas.itemconfig(f"indicator_{device_name}", fill=device.indicator_color)
-                break
+        device = self.topology.device(device_name)
+        device.update_status(status)
+        self.canvas.itemconfig(f"indicator_{device_name}", fill=device.indicator_color)
     
     def start_transmission(self):
         """Начало передачи пакетов"""
@@ -392,6 +1260,10 @@ class NetworkTerminal:
             self.log_message("\n" + "="*50)
             self.log_message("Передача пакетов начата")
             self.log_message("="*50)
+            
+            # Первое событие генерации пакета (при воспроизведении пакеты берутся из записи)
+            if self.replay is None:
+                self.start_generation()
     
     def stop_transmission(self):
         """Остановка передачи пакетов"""
@@ -400,6 +1272,12 @@ class NetworkTerminal:
             self.stop_requested = True
             self.running = False
             
+            # Отменяем все запланированные события и убираем пакеты в пути
+            self.stop_replay()
+            self.cancel_packet_events()
+            if self.capture:
+                self.capture.flush()
+            
             # Получаем текущее время в формате HH:MM:SS
             current_time = datetime.now().strftime("%H:%M:%S")
             
@@ -422,26 +1300,42 @@ class NetworkTerminal:
             self.stop_requested = True
             self.running = False
         
+        # Отменяем все события планировщика и воспроизведение записи
+        self.stop_replay()
+        self.scheduler.clear()
+        
         # Сбрасываем все счетчики
         self.packet_counter = 0
         self.total_packets = 0
+        self.backpressure_skips = 0
+        self.backoff = 1
         
         # Очищаем очередь сообщений
-        while not self.message_queue.empty():
-            try:
-                self.message_queue.get_nowait()
-            except:
-                break
+        self.log_sink.clear()
         
-        # Очищаем холст (удаляем все пакеты)
-        self.canvas.delete("packet")
+        # Очищаем холст (пул элементов пакетов создается заново)
+        self.renderer.clear()
         self.canvas.delete("all")
+        self.renderer.create_items()
+        self.flow_view = False
+        self.link_styles = {}
         
         # Сбрасываем статусы всех устройств
         for device in self.devices:
             device.status = 'idle'
             device.indicator_color = '#2D3047'
-            device.packets = []
+        self.clear_device_buffers()
+        
+        # Очищаем историю доставленных пакетов и состояние каналов
+        self.packet_store.clear()
+        self.dropped_packets = 0
+        self.flood_copies = 0
+        self.flood_drops = 0
+        self.metrics.clear()
+        self.topology.reset_links()
+        for switch in self.switches.values():
+            switch.reset()
+        self.packet_slots.clear()
         
         # Перерисовываем сеть
         self.draw_network()
@@ -469,199 +1363,721 @@ class NetworkTerminal:
     
     def update_speed(self, value):
         """Обновление скорости передачи"""
-        self.packets_per_second = int(value)
-    
-    def log_message(self, message):
-        """Добавление сообщения в консоль"""
-        self.message_queue.put(message)
+        rate = 10 ** float(value)
+        self.set_rate(rate)
+        self.rate_label.config(text=f"{rate:,.1f} пакетов/с")
     
-    def generate_packet(self):
-        """Генерация случайного пакета"""
-        if not self.running or self.stop_requested:
-            return None
-        
-        self.packet_counter += 1
-        self.total_packets += 1
-        
-        # Случайный выбор источника и получателя
-        sources = ['ПК1', 'ПК2', 'ПК3', 'ПК4']
-        destinations = ['ПК1', 'ПК2', 'ПК3', 'ПК4']
-        
-        source = random.choice(sources)
-        # Исключаем возможность отправки пакета самому себе
-        possible_destinations = [d for d in destinations if d != source]
-        if not possible_destinations:
-            possible_destinations = destinations
-        
-        destination = random.choice(possible_destinations)
-        
-        # Случайный размер пакета
-        size = random.randint(100, 1500)
-        
-        packet = NetworkPacket(self.packet_counter, source, destination, size)
-        packet.sent_time = datetime.now()
-        
-        # Логирование создания пакета
-        timestamp = packet.timestamp.strftime("%H:%M:%S.%f")[:-3]
-        self.log_message(f"[{timestamp}] Пакет #{packet.id}: {packet.source} -> {packet.destination}, Размер: {packet.size} байт")
-        
-        return packet
+    def update_traffic_model(self, event=None):
+        """Смена модели потока пакетов"""
+        self.set_traffic(create_arrival_process(self.traffic_model.get(),
+                                                self.packets_per_second))
     
-    def simulate_delivery(self, packet):
-        """Симуляция доставки пакета"""
+    def animate_packet(self, packet):
+        """Анимация движения пакета"""
         # Проверяем флаг остановки
         if self.stop_requested:
             return
         
-        # Имитация задержки
-        delay_ms = random.randint(2000, 4000)
-        
-        # Разбиваем задержку на части для проверки флага остановки
-        chunk_size = 0.1  # 100 мс
-        chunks = int(delay_ms / 100)
-        
-        for i in range(chunks):
-            if self.stop_requested:
-                return
-            time.sleep(chunk_size)
-        
-        # Проверяем еще раз после задержки
-        if self.stop_requested:
+        # Маршрут пакета по кэшированной таблице продвижения
+        path = self.topology.path(packet.source, packet.destination)
+        if not path:
             return
         
-        packet.delivered_time = datetime.now()
-        packet.calculate_delay()
+        # Пакет учитывается в оценке числа пакетов в пути; в обобщенном виде не рисуется
+        lifetime = self.packet_lifetime(path)
+        self.flow_lifetime += lifetime
+        if self.flow_view:
+            return
         
-        # Логирование доставки
-        timestamp = packet.delivered_time.strftime("%H:%M:%S.%f")[:-3]
-        self.log_message(f"[{timestamp}] Пакет #{packet.id} доставлен на {packet.destination} (задержка: {packet.delay} мс)")
+        # Анимация от источника: позиции рассчитывает отрисовщик кадров
+        source_device = self.devices[path[0]]
+        self.update_device_status(source_device.name, 'sending')
+        slot = self.renderer.add(packet.color, source_device.x, source_device.y,
+                                 source_device.x, source_device.y, 0)
+        if slot is None:
+            # Пул элементов исчерпан: пакет учитывается только в маркере "+N в пути"
+            # до момента, когда закончилась бы его анимация
+            self.scheduler.schedule(lifetime, self.renderer.release_overflow)
+            return
+        self.packet_slots[packet.id] = slot
         
-        # Логирование прохождения через коммутатор (раньше времени доставки)
-        switch_time = datetime.fromtimestamp(
-            packet.sent_time.timestamp() + (packet.delivered_time.timestamp() - packet.sent_time.timestamp()) * 0.5
-        ).strftime("%H:%M:%S.%f")[:-3]
-        self.log_message(f"[{switch_time}] Пакет #{packet.id} достиг SWITCH")
+        self.animate_hop(packet, slot, path, 0)
     
-    def animate_packet(self, packet):
-        """Анимация движения пакета"""
-        # Проверяем флаг остановки
-        if self.stop_requested:
+    def animate_hop(self, packet, slot, path, hop):
+        """Движение пакета по соединению path[hop] -> path[hop + 1]"""
+        if self.packet_slots.get(packet.id) != slot:
+            return  # пакет отброшен
+        start_device = self.devices[path[hop]]
+        end_device = self.devices[path[hop + 1]]
+        last_hop = hop + 2 == len(path)
+        
+        if hop > 0:
+            self.update_device_status(start_device.name, 'idle')
+        if last_hop:
+            self.update_device_status(end_device.name, 'receiving')
+        
+        self.renderer.set_segment(slot, start_device.x, start_device.y,
+                                  end_device.x, end_device.y, self.segment_duration)
+        
+        if last_hop:
+            # После прибытия пакет остается у получателя еще 0.5 с
+            self.scheduler.schedule(self.segment_duration + 0.5, self.remove_packet, packet, slot)
+        else:
+            self.scheduler.schedule(self.segment_duration, self.on_animation_at_switch,
+                                    packet, slot, path, hop + 1)
+    
+    def on_animation_at_switch(self, packet, slot, path, hop):
+        """Пакет достиг коммутатора: пауза на обработку"""
+        if self.packet_slots.get(packet.id) != slot:
+            return  # пакет отброшен
+        switch_device = self.devices[path[hop]]
+        self.update_device_status(switch_device.name, 'processing')
+        self.renderer.set_segment(slot, switch_device.x, switch_device.y,
+                                  switch_device.x, switch_device.y, 0)
+        if self.trace:
+            now = self.scheduler.now()
+            self.trace.span(path[hop], "пауза анимации", packet.id, now, now + 0.3, CATEGORY_ANIMATION)
+        self.scheduler.schedule(0.3, self.animate_hop, packet, slot, path, hop)
+    
+    def remove_packet(self, packet, slot):
+        """Удаление пакета с холста"""
+        if self.packet_slots.get(packet.id) != slot:
+            return  # пакет уже удален при отбрасывании
+        del self.packet_slots[packet.id]
+        self.renderer.remove(slot)
+        self.update_device_status(self.devices[packet.destination].name, 'idle')
+    
+    def cancel_packet_events(self):
+        """Отмена всех событий пакетов и очистка холста от пакетов"""
+        self.scheduler.clear()
+        self.topology.flush_links()
+        self.clear_device_buffers()
+        self.renderer.clear()
+        self.packet_slots.clear()
+        for device in self.devices:
+            self.update_device_status(device.name, 'idle')
+    
+    def pump_scheduler(self):
+        """Выполнение наступивших событий в главном потоке Tk"""
+        self.scheduler.run_due()
+        self.root.after(self.scheduler_interval_ms, self.pump_scheduler)
+    
+    def start_scheduler(self):
+        """Запуск планировщика событий"""
+        self.root.after(self.scheduler_interval_ms, self.pump_scheduler)
+    
+    def log_message(self, message, time_ns=None):
+        """Добавление сообщения в консоль и журнал сессии"""
+        super().log_message(message, time_ns)
+        self.log_sink.put(message, time_ns)
+    
+    def on_close(self):
+        """Закрытие окна: дописывание журнала сессии на диск"""
+        self.stop_capture()
+        self.stop_trace()
+        if self.session_log:
+            self.session_log.close()
+        self.root.destroy()
+    
+    def on_packet_dropped(self, packet, from_index, to_index):
+        """Отброшенный пакет убирается с холста"""
+        super().on_packet_dropped(packet, from_index, to_index)
+        slot = self.packet_slots.pop(packet.id, None)
+        if slot is not None:
+            self.renderer.remove(slot)
+    
+    def links_text(self):
+        """Сводка по самым загруженным каналам"""
+        lines = [f"КАНАЛЫ (отброшено пакетов: {self.dropped_packets}, "
+                 f"отложено источниками: {self.backpressure_skips})"]
+        for utilization, depth, drops, source, target in self.link_statistics(5):
+            lines.append(f"{source}->{target}: {utilization:4.0%} очередь {depth} потери {drops}")
+        for received, entries, hit_rate, floods, _, name in self.switch_statistics(2):
+            lines.append(f"{name}: MAC {entries}, попаданий {hit_rate:.0%}, рассылок {floods}")
+        return "\n".join(lines)
+    
+    def toggle_capture(self):
+        """Включение и выключение записи пакетов в файл"""
+        if self.capture:
+            self.stop_capture()
+            self.capture_button.config(text="⏺ Запись", bg='#118AB2')
             return
-        
-        # Находим устройства
-        source_device = next((d for d in self.devices if d.name == packet.source), None)
-        dest_device = next((d for d in self.devices if d.name == packet.destination), None)
-        switch_device = next((d for d in self.devices if d.type == 'switch'), None)
-        
-        if not all([source_device, dest_device, switch_device]):
+        path = filedialog.asksaveasfilename(defaultextension=".lancap",
+                                            filetypes=[("Запись пакетов", "*.lancap")],
+                                            confirmoverwrite=False)
+        if path:
+            self.start_capture(path)
+            self.capture_button.config(text="⏹ Запись", bg='#EF476F')
+    
+    def toggle_trace(self):
+        """Включение и выключение записи трассы пакетов для Perfetto"""
+        if self.trace:
+            self.stop_trace()
+            self.trace_button.config(text="⏺ Трасса", bg='#118AB2')
             return
-        
-        # Анимация от источника к коммутатору
-        self.update_device_status(packet.source, 'sending')
-        packet_obj = self.draw_packet(packet, source_device.x, source_device.y)
-        
-        steps = 50
-        for i in range(steps + 1):
-            if self.stop_requested:
-                self.canvas.delete(packet_obj)
-                self.update_device_status(packet.source, 'idle')
-                return
-            t = i / steps
-            x = source_device.x + (switch_device.x - source_device.x) * t
-            y = source_device.y + (switch_device.y - source_device.y) * t
-            self.canvas.coords(packet_obj, x-15, y-15, x+15, y+15)
-            self.root.update()
-            time.sleep(0.02)
-        
-        # Пауза на коммутаторе
-        if self.stop_requested:
-            self.canvas.delete(packet_obj)
-            self.update_device_status(packet.source, 'idle')
-            self.update_device_status('SWITCH', 'idle')
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("Chrome Trace / Perfetto", "*.json")],
+                                            initialfile="network_trace.json")
+        if path:
+            self.start_trace(path)
+            self.trace_button.config(text="⏹ Трасса", bg='#EF476F')
+    
+    def replay_capture(self):
+        """Воспроизведение записи через тот же путь доставки"""
+        path = filedialog.askopenfilename(filetypes=[("Запись пакетов", "*.lancap")])
+        if not path:
             return
+        self.stop_transmission()
+        try:
+            self.start_replay(path, REPLAY_SPEEDS[self.replay_speed_choice.get()])
+        except (OSError, ValueError) as e:
+            self.log_message(f"Ошибка воспроизведения: {e}")
+            return
+        self.start_transmission()
+    
+    def export_metrics_csv(self):
+        """Сохранение гистограмм задержек в CSV"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            initialfile=f"latency_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        )
+        if filename:
+            self.metrics.export_csv(filename, self.device_name)
+            self.log_message(f"Метрики сохранены: {filename}")
+    
+    def export_metrics_prometheus(self):
+        """Сохранение метрик в текстовом формате Prometheus"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".prom",
+            filetypes=[("Prometheus text", "*.prom"), ("All files", "*.*")],
+            initialfile="network_terminal.prom"
+        )
+        if filename:
+            self.metrics.export_prometheus(filename, self.device_name, self.scheduler.now())
+            self.log_message(f"Метрики сохранены: {filename}")
+    
+    def update_stats_labels(self):
+        """Обновление статистики отрисовки и журнала раз в секунду"""
+        render_text = self.renderer.stats_text()
+        if self.flow_view:
+            render_text += f"\nОбобщенный вид: ~{self.flow_estimate:,.0f} в пути (порог {self.lod_threshold})"
+        self.render_label.config(text=render_text)
+        log_text = self.log_sink.stats_text()
+        if self.session_log:
+            log_text += "\n" + self.session_log.stats_text()
+        self.log_label.config(text=log_text)
+        self.links_label.config(text=self.links_text())
+        self.metrics_label.config(text="\n".join(self.metrics.summary_lines(self.scheduler.now())))
+        self.root.after(1000, self.update_stats_labels)
+
+class HeadlessSimulation(NetworkSimulation):
+    """Безголовая имитация ЛВС на виртуальных часах (быстрее реального времени)"""
+    
+    def __init__(self, packets_per_second=3, verbose=False, topology=None, traffic=None,
+                 log_dir=None):
+        super().__init__(EventScheduler(virtual=True), topology,
+                         traffic or ConstantArrivals(packets_per_second))
+        self.verbose = verbose
+        if log_dir:
+            self.start_session_log(log_dir)
+        self.log_enabled = verbose or self.session_log is not None
+    
+    def log_message(self, message, time_ns=None):
+        """Вывод сообщения в стандартный поток и журнал сессии"""
+        super().log_message(message, time_ns)
+        if self.verbose:
+            print(message if time_ns is None else f"[{self.format_time(time_ns)}] {message}")
+    
+    def run(self, duration):
+        """Имитация duration секунд виртуального времени"""
+        cpu_start = time.process_time()
         
-        self.update_device_status('SWITCH', 'processing')
-        time.sleep(0.3)
+        # Генерация пакетов в течение заданного времени
+        self.running = True
+        if self.replay is None:
+            self.start_generation()
+        self.scheduler.run_until(duration)
         
-        # Анимация от коммутатора к получателю
-        if self.stop_requested:
-            self.canvas.delete(packet_obj)
-            self.update_device_status('SWITCH', 'idle')
-            self.update_device_status(packet.source, 'idle')
-            return
+        # Остановка генерации и доставка оставшихся пакетов
+        self.running = False
+        in_flight = self.total_packets - len(self.packet_store)
+        self.scheduler.run_until(float('inf'))
         
-        self.update_device_status('SWITCH', 'idle')
-        self.update_device_status(packet.destination, 'receiving')
+        cpu_time = time.process_time() - cpu_start
+        self.print_statistics(duration, in_flight, cpu_time)
+    
+    def print_statistics(self, duration, in_flight, cpu_time):
+        """Вывод итоговой статистики доставки и задержек"""
+        # Задержки считаются по колонкам истории доставленных пакетов
+        delays = self.packet_store.delays_ms()
+        
+        cpu_time = max(cpu_time, 1e-9)
+        print("=" * 50)
+        print("ИТОГИ ИМИТАЦИИ")
+        print("=" * 50)
+        if self.replay_source:
+            source = f"воспроизведение {self.replay_source}, {self.replay_speed:g}x"
+        else:
+            source = f"скорость {self.packets_per_second:g} пакетов/с, модель {self.traffic.name}"
+        print(f"Виртуальное время: {duration:.1f} с ({source})")
+        print(f"Сгенерировано пакетов: {self.total_packets}")
+        print(f"Доставлено пакетов: {len(self.packet_store)}")
+        print(f"В пути на момент остановки генерации: {in_flight}")
+        if len(delays):
+            p50, p95, p99 = np.percentile(delays, [50, 95, 99])
+            print(f"Задержка, мс: мин {delays.min()}, средн {delays.mean():.1f}, "
+                  f"p50 {p50:.0f}, p95 {p95:.0f}, p99 {p99:.0f}, макс {delays.max()}")
+        print(f"Отброшено пакетов (переполнение очередей): {self.dropped_packets}")
+        print(f"Отложено генераций (буфер источника заполнен): {self.backpressure_skips}")
+        print(f"История пакетов: {self.packet_store.memory_bytes() / 2**20:.1f} МБ")
+        
+        # Средняя загрузка каналов за все время имитации
+        print("Самые загруженные каналы:")
+        for (a, b), port in sorted(self.topology.ports.items(),
+                                   key=lambda item: item[1].busy_time, reverse=True)[:5]:
+            utilization = min(1.0, port.busy_time / max(self.scheduler.now(), 1e-9))
+            print(f"  {self.devices[a].name} -> {self.devices[b].name}: загрузка {utilization:.0%}, "
+                  f"пакетов {port.packets_sent}, потери {port.drops}")
+        if self.switches:
+            print("Таблицы коммутации:")
+            for received, entries, hit_rate, floods, aged_out, name in self.switch_statistics(5):
+                print(f"  {name}: кадров {received}, записей {entries}, попаданий {hit_rate:.1%}, "
+                      f"рассылок {floods}, устарело {aged_out}")
+            print(f"  копий рассылки в каналах {self.flood_copies}, отброшено очередями портов {self.flood_drops}")
+            # Порты самого нагруженного коммутатора
+            index = self.topology.device_index(self.switch_statistics(1)[0][5])
+            switch = self.switches[index]
+            for port, counters in sorted(switch.ports.items(),
+                                         key=lambda item: item[1].rx_packets, reverse=True)[:5]:
+                print(f"    порт {self.devices[port].name}: принято {counters.rx_packets}, "
+                      f"передано {switch.port_tx_packets(port)} (из них рассылкой "
+                      f"{switch.port_tx_packets(port) - counters.tx_packets})")
+        print(f"Процессорное время: {cpu_time:.3f} с")
+        print(f"Производительность: {self.total_packets / cpu_time:,.0f} пакетов/с, "
+              f"{self.scheduler.processed_events / cpu_time:,.0f} событий/с")
+        print(f"Ускорение относительно реального времени: {duration / cpu_time:,.1f}x")
+
+class ShardSimulation(HeadlessSimulation):
+    """Часть сети в отдельном процессе: свои устройства, обмен пакетами через общую память"""
+    
+    def __init__(self, shard, owner, channels, stats, packets_per_second, topology=None, traffic=None):
+        super().__init__(packets_per_second, False, topology, traffic)
+        self.shard = shard
+        self.owner = owner  # индекс устройства -> номер части
+        self.channels = channels
+        self.stats = stats
+        
+        # Пакеты генерируют только компьютеры этой части, получатели - любые
+        self.source_indices = [i for i in self.host_indices if owner[i] == shard]
+        self.sent_cross = 0
+        self.received_cross = 0
+        self.windows = 0
+        
+        # Время, раньше которого события на устройстве не приведут к пакету в другой части
+        self.reach = cross_shard_reach(self.topology, owner, self.switch_processing_s)
+        self.source_reach = min((self.reach[i] for i in self.source_indices), default=float('inf'))
+        self.min_reach = min(self.reach, default=float('inf'))
+        self.sent_bound = float('inf')  # то же для пакетов, отправленных в текущем окне
+    
+    def schedule_arrival(self, packet, path, hop, when):
+        """Прибытие на устройство другой части передается через общую память"""
+        target = self.owner[path[hop]]
+        if target == self.shard:
+            super().schedule_arrival(packet, path, hop, when)
+            return
+        self.sent_cross += 1
+        self.sent_bound = min(self.sent_bound, when + self.reach[path[hop]])
+        # Пакет покинул часть - буфер источника освобождается при передаче
+        self.devices[packet.source].release_packet(packet)
+        self.channels.send(target, (packet.id, packet.source, packet.destination, packet.size,
+                                    packet.color_index, path[hop - 1], path[hop], packet.sent_ns, when))
+    
+    def schedule_flood_copy(self, previous, node, source, when):
+        """Копии рассылки не передаются в другие части: нагрузка учитывается на каналах своей части"""
+        if self.owner[node] == self.shard:
+            super().schedule_flood_copy(previous, node, source, when)
+    
+    def accept(self, record):
+        """Пакет, пришедший из другой части"""
+        packet_id, source, destination, size, color_index, previous, node, sent_ns, when = record
+        packet = NetworkPacket(packet_id, source, destination, size, sent_ns)
+        packet.color_index = color_index
+        self.received_cross += 1
+        # Маршрут мог измениться по таблице коммутации: дальше пакет идет по кратчайшему маршруту
+        # от node, предыдущий узел нужен коммутатору для обучения
+        path = (previous,) + self.topology.path(node, destination)
+        super().schedule_arrival(packet, path, 1, when)
+    
+    def output_bound(self):
+        """Наименьшее время прибытия в другую часть пакета, который могут породить
+        запланированные события и отправленные в этом окне пакеты"""
+        bound = self.sent_bound
+        reach = self.reach
+        switch_reached = self.on_switch_reached
+        generation_tick = self.generation_tick
+        # Доставка и копия рассылки новых пакетов не порождают
+        final = (self.on_packet_delivered, self.on_flood_copy)
+        for when, _, callback, args in self.scheduler.events:
+            if callback is None or when >= bound:
+                continue
+            if callback == switch_reached:
+                when += reach[args[1][args[2]]]
+            elif callback == generation_tick:
+                if not self.running:
+                    continue
+                when += self.source_reach
+            elif callback in final:
+                continue
+            else:
+                when += self.min_reach
+            if when < bound:
+                bound = when
+        return bound
+    
+    def run_windows(self, duration, lookahead, barrier):
+        """Имитация окнами с обменом пакетами между частями после каждого окна
+        
+        Окно заканчивается на наименьшей по всем частям границе output_bound: раньше
+        нее ни один пакет из другой части прийти не может, поэтому в пределах окна
+        части независимы (консервативная синхронизация). Первое окно - lookahead.
+        """
+        cpu_start = time.process_time()
+        control = self.stats.control
+        shard = self.shard
+        t = 0.0
+        end = min(lookahead, duration)
+        next_publish = time.monotonic()
+        
+        self.running = True
+        if self.source_indices:
+            self.start_generation()
         
-        for i in range(steps + 1):
-            if self.stop_requested:
-                self.canvas.delete(packet_obj)
-                self.update_device_status(packet.destination, 'idle')
-                return
-            t = i / steps
-            x = switch_device.x + (dest_device.x - switch_device.x) * t
-            y = switch_device.y + (dest_device.y - switch_device.y) * t
-            self.canvas.coords(packet_obj, x-15, y-15, x+15, y+15)
-            self.root.update()
-            time.sleep(0.02)
-        
-        # Удаление пакета
-        if not self.stop_requested:
-            time.sleep(0.5)
-            self.canvas.delete(packet_obj)
-            self.update_device_status(packet.destination, 'idle')
-    
-    def packet_generator_thread(self):
-        """Поток генерации и обработки пакетов"""
         while True:
-            if self.running and not self.stop_requested:
-                packet = self.generate_packet()
-                if packet:
-                    # Запуск анимации и симуляции в отдельных потоках
-                    threading.Thread(
-                        target=self.animate_packet,
-                        args=(packet,),
-                        daemon=True
-                    ).start()
-                    
-                    threading.Thread(
-                        target=self.simulate_delivery,
-                        args=(packet,),
-                        daemon=True
-                    ).start()
-                
-                # Задержка между генерацией пакетов
-                delay = 1.0 / self.packets_per_second
-                chunks = int(delay / 0.1)
-                for i in range(chunks):
-                    if self.stop_requested:
-                        break
-                    time.sleep(0.1)
+            parity = self.windows % 2
+            if t >= duration:
+                self.running = False
+            self.scheduler.run_until(end)
+            
+            # Пакеты, не поместившиеся в очередь общей памяти, считаются отброшенными
+            overflow = self.channels.overflow
+            sent = self.channels.flush(parity, shard)
+            lost = self.channels.overflow - overflow
+            if lost:
+                self.dropped_packets += lost
+                self.metrics.dropped += lost
+            
+            control[parity, shard] = (self.output_bound(), sent)
+            self.sent_bound = float('inf')
+            barrier.wait()
+            
+            for record in self.channels.receive(parity, shard):
+                self.accept(record)
+            bound = control[parity, :, 0].min()
+            self.windows += 1
+            t = end
+            
+            if t >= duration:
+                if bound == float('inf'):
+                    # Пакетов между частями больше не будет - оставшиеся события локальные
+                    self.running = False
+                    self.scheduler.run_until(float('inf'))
+                    break
+                end = bound
             else:
-                time.sleep(0.1)
-    
-    def start_animation_thread(self):
-        """Запуск потока анимации"""
-        threading.Thread(target=self.packet_generator_thread, daemon=True).start()
-    
-    def start_log_thread(self):
-        """Запуск потока обработки логов"""
-        def process_logs():
-            while True:
-                try:
-                    message = self.message_queue.get(timeout=0.1)
-                    self.console.insert(tk.END, message + "\n")
-                    self.console.see(tk.END)
-                    self.root.update()
-                except:
-                    pass
-        
-        threading.Thread(target=process_logs, daemon=True).start()
+                end = min(bound, duration)
+            
+            if time.monotonic() >= next_publish:
+                self.publish(cpu_start)
+                next_publish = time.monotonic() + 0.2
+        
+        self.publish(cpu_start, done=True)
+    
+    def summary(self, cpu_time):
+        """Итоговые счетчики части"""
+        return {
+            "devices": sum(1 for owner in self.owner if owner == self.shard),
+            "generated": self.total_packets,
+            "delivered": len(self.packet_store),
+            "dropped": self.dropped_packets,
+            "sent_cross": self.sent_cross,
+            "received_cross": self.received_cross,
+            "events": self.scheduler.processed_events,
+            "windows": self.windows,
+            "cpu_time": cpu_time,
+        }
+    
+    def publish(self, cpu_start, done=False):
+        """Обновление живой статистики в общей памяти"""
+        summary = self.summary(time.process_time() - cpu_start)
+        values = [self.scheduler.now()] + [summary[field] for field in STAT_FIELDS[1:-1]] + [done]
+        self.stats.publish(self.shard, values, self.metrics.total.counts)
+        self.cpu_time = summary["cpu_time"]
+
+def shard_worker(shard, config, barrier, results):
+    """Процесс одной части распределенной имитации"""
+    seed = config["seed"]
+    random.seed(None if seed is None else seed + shard)
+    topology = load_topology(config["topology"], NetworkDevice) if config["topology"] else None
+    channels = ShardChannels(config["shards"], config["capacity"], config["channels"])
+    stats = ShardStats(name=config["stats"])
+    try:
+        owner = config["owner"]
+        hosts = sum(1 for index in config["hosts"] if owner[index] == shard)
+        rate = config["rate"] * hosts / max(len(config["hosts"]), 1)
+        traffic = create_arrival_process(config["traffic"], max(rate, 1e-9),
+                                         np.random.default_rng(None if seed is None else seed + shard))
+        simulation = ShardSimulation(shard, owner, channels, stats, rate, topology, traffic)
+        if config["device_buffer"]:
+            simulation.set_device_buffers(config["device_buffer"])
+        if config["chrome_trace"]:
+            # Каждая часть пишет свою трассу: трассы открываются в Perfetto вместе
+            base, extension = os.path.splitext(config["chrome_trace"])
+            simulation.start_trace(f"{base}.shard{shard}{extension or '.json'}")
+        simulation.run_windows(config["duration"], config["lookahead"], barrier)
+        simulation.stop_trace()
+        results.put((shard, simulation.summary(simulation.cpu_time), simulation.metrics))
+    except Exception:
+        # Остальные процессы не должны ждать на барьере вечно
+        barrier.abort()
+        raise
+    finally:
+        stats.close()
+        channels.close()
+
+def run_sharded(args, topology, shards):
+    """Распределенная имитация: части сети в отдельных процессах, объединенный отчет"""
+    reference = HeadlessSimulation(args.rate, topology=topology)
+    duration = args.duration or 60.0
+    owner = partition_topology(reference.topology, shards)
+    lookahead = cross_shard_lookahead(reference.topology, owner)
+    if lookahead <= 0:
+        raise SystemExit("Каналы между частями должны иметь ненулевую задержку распространения")
+    lookahead = min(lookahead, duration)
+    
+    channels = ShardChannels(shards)
+    stats = ShardStats(shards)
+    stats.header[1] = duration
+    config = {
+        "shards": shards, "owner": owner, "hosts": reference.host_indices,
+        "topology": args.topology, "rate": args.rate, "traffic": args.traffic, "seed": args.seed,
+        "duration": duration, "lookahead": lookahead, "device_buffer": args.device_buffer,
+        "chrome_trace": args.chrome_trace,
+        "channels": channels.name, "capacity": channels.capacity, "stats": stats.name,
+    }
+    print(f"Частей: {shards}, шаг синхронизации {lookahead * 1000:.3f} мс")
+    print(f"Для наблюдения: python \"Network terminal.py\" --attach {stats.name}")
+    
+    barrier = multiprocessing.Barrier(shards)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=shard_worker, args=(shard, config, barrier, results),
+                                         name=f"shard-{shard}")
+                 for shard in range(shards)]
+    wall_start = time.perf_counter()
+    for process in processes:
+        process.start()
+    
+    summaries = {}
+    metrics = MetricsRegistry()
+    try:
+        while len(summaries) < shards:
+            try:
+                shard, summary, shard_metrics = results.get(timeout=1.0)
+            except queue.Empty:
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    raise SystemExit("Процесс части завершился с ошибкой")
+                continue
+            summaries[shard] = summary
+            metrics.merge(shard_metrics)
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        stats.header[2] = 1
+        stats.close(unlink=True)
+        channels.close(unlink=True)
+    
+    print_shard_report(summaries, metrics, duration, time.perf_counter() - wall_start)
+    if args.metrics_csv:
+        metrics.export_csv(args.metrics_csv, reference.device_name)
+    if args.metrics_prom:
+        metrics.export_prometheus(args.metrics_prom, reference.device_name, duration)
+
+def print_shard_report(summaries, metrics, duration, wall_time):
+    """Объединенный отчет распределенной имитации"""
+    print("=" * 50)
+    print("ИТОГИ РАСПРЕДЕЛЕННОЙ ИМИТАЦИИ")
+    print("=" * 50)
+    print(f"{'часть':>5} {'устр.':>6} {'сгенер.':>9} {'доставл.':>9} {'отбр.':>7} "
+          f"{'отправл.':>9} {'принято':>9} {'событий':>10} {'процессор, с':>13}")
+    for shard in sorted(summaries):
+        s = summaries[shard]
+        print(f"{shard:>5} {s['devices']:>6} {s['generated']:>9} {s['delivered']:>9} {s['dropped']:>7} "
+              f"{s['sent_cross']:>9} {s['received_cross']:>9} {s['events']:>10} {s['cpu_time']:>13.2f}")
+    
+    total = {key: sum(s[key] for s in summaries.values())
+             for key in ("generated", "delivered", "dropped", "sent_cross", "events")}
+    print(f"Виртуальное время: {duration:.1f} с, окон синхронизации: {summaries[0]['windows']}")
+    print(f"Сгенерировано пакетов: {total['generated']}, доставлено: {total['delivered']}, "
+          f"отброшено: {total['dropped']}")
+    print(f"Пакетов между частями: {total['sent_cross']}")
+    latency = metrics.total
+    print(f"Задержка, мс: средн {latency.mean() / 1000:.2f}, p50 {latency.percentile(50) / 1000:.2f}, "
+          f"p99 {latency.percentile(99) / 1000:.2f}, макс {latency.max / 1000:.2f}")
+    print(f"Реальное время: {wall_time:.2f} с, {total['generated'] / wall_time:,.0f} пакетов/с, "
+          f"{total['events'] / wall_time:,.0f} событий/с")
+
+class ShardMonitor:
+    """Окно наблюдения за распределенной имитацией (подключение к координатору)"""
+    
+    def __init__(self, root, stats_name, interval_ms=500):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.stats = ShardStats(name=stats_name, external=True)
+        self.root.title(f"Сетевой терминал - распределенная имитация ({stats_name})")
+        self.root.configure(bg='#1A1A2E')
+        
+        columns = ("shard",) + STAT_FIELDS[:-1]
+        headings = ("Часть", "Время, с", "Сгенер.", "Доставл.", "Отбр.",
+                    "Отправл.", "Принято", "Событий", "Процессор, с")
+        self.table = ttk.Treeview(self.root, columns=columns, show='headings',
+                                  height=min(self.stats.shards, 20))
+        for column, heading in zip(columns, headings):
+            self.table.heading(column, text=heading)
+            self.table.column(column, width=90, anchor=tk.E)
+        self.table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        for shard in range(self.stats.shards):
+            self.table.insert('', tk.END, iid=str(shard))
+        
+        self.totals_label = tk.Label(self.root, text="", font=('Consolas', 10),
+                                     bg='#1A1A2E', fg='#4ECDC4', justify=tk.LEFT)
+        self.totals_label.pack(anchor=tk.W, padx=10, pady=(0, 10))
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.refresh()
+    
+    def refresh(self):
+        """Обновление таблицы по общей памяти координатора"""
+        rows = self.stats.rows.copy()
+        for shard, row in enumerate(rows.tolist()):
+            values = [shard, f"{row[0]:.2f}"] + [int(v) for v in row[1:-2]] + [f"{row[-2]:.1f}"]
+            self.table.item(str(shard), values=values)
+        
+        totals = self.stats.totals()
+        latency = LatencyHistogram.from_counts(self.stats.histograms.sum(axis=0))
+        status = "завершена" if self.stats.header[2] else "выполняется"
+        self.totals_label.config(text=(
+            f"Имитация {status}: время модели {totals['virtual_time']:.2f} из {self.stats.header[1]:.0f} с\n"
+            f"Сгенерировано {int(totals['generated'])}, доставлено {int(totals['delivered'])}, "
+            f"отброшено {int(totals['dropped'])}, между частями {int(totals['sent_cross'])}\n"
+            f"Задержка, мс: p50 {latency.percentile(50) / 1000:.2f}, "
+            f"p99 {latency.percentile(99) / 1000:.2f}, макс {latency.max / 1000:.2f}"))
+        self.root.after(self.interval_ms, self.refresh)
+    
+    def on_close(self):
+        """Отключение от общей памяти при закрытии окна"""
+        self.stats.close()
+        self.root.destroy()
 
 def main():
     """Основная функция"""
+    parser = argparse.ArgumentParser(description="Сетевой терминал - Имитация ЛВС")
+    parser.add_argument("--headless", action="store_true",
+                        help="имитация без интерфейса на виртуальных часах")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="виртуальное время имитации, с (по умолчанию 60 или длительность записи)")
+    parser.add_argument("--rate", type=float, default=3,
+                        help="скорость генерации, пакетов/с")
+    parser.add_argument("--traffic", choices=sorted(ARRIVAL_MODELS), default="constant",
+                        help="модель потока пакетов")
+    parser.add_argument("--trace", default=None,
+                        help="CSV-трасса 'время_с,размер' для воспроизведения (заменяет --traffic)")
+    parser.add_argument("--capture", default=None,
+                        help="двоичный файл для записи сгенерированных пакетов (дозапись)")
+    parser.add_argument("--chrome-trace", default=None,
+                        help="JSON-файл трассы пакетов для chrome://tracing и Perfetto")
+    parser.add_argument("--replay", default=None,
+                        help="воспроизвести файл записи вместо случайной генерации")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="скорость воспроизведения: 1, N или 0 (максимально быстро)")
+    parser.add_argument("--device-buffer", type=int, default=None,
+                        help=f"емкость буфера каждого устройства, пакетов (по умолчанию {DEFAULT_DEVICE_BUFFER} "
+                             f"или значение buffer устройства в файле топологии)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="число процессов распределенной имитации (безголовый режим)")
+    parser.add_argument("--attach", default=None,
+                        help="подключить окно наблюдения к координатору распределенной имитации")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="начальное значение генератора случайных чисел")
+    parser.add_argument("--verbose", action="store_true",
+                        help="выводить журнал каждого пакета")
+    parser.add_argument("--lod-threshold", type=int, default=DEFAULT_LOD_THRESHOLD,
+                        help="число пакетов в пути, выше которого показываются потоки по каналам")
+    parser.add_argument("--console-lines", type=int, default=2000,
+                        help="максимальное число строк в консоли интерфейса")
+    parser.add_argument("--log-dir", default=None,
+                        help="каталог журнала сессии с ротацией (в интерфейсе по умолчанию logs рядом с программой)")
+    parser.add_argument("--topology", default=None,
+                        help="JSON-файл топологии сети (по умолчанию 4 ПК и коммутатор)")
+    parser.add_argument("--metrics-csv", default=None,
+                        help="CSV-файл для гистограмм задержек (безголовый режим)")
+    parser.add_argument("--metrics-prom", default=None,
+                        help="файл метрик в формате Prometheus (безголовый режим)")
+    args = parser.parse_args()
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    topology = load_topology(args.topology, NetworkDevice) if args.topology else None
+    traffic = create_arrival_process(args.traffic, args.rate, np.random.default_rng(args.seed),
+                                     args.trace)
+    
+    if args.attach:
+        root = tk.Tk()
+        ShardMonitor(root, args.attach)
+        root.mainloop()
+        return
+    
+    if args.shards > 1:
+        if args.replay or args.capture or args.trace:
+            parser.error("запись и воспроизведение не поддерживаются в распределенном режиме")
+        run_sharded(args, topology, args.shards)
+        return
+    
+    if args.headless:
+        simulation = HeadlessSimulation(args.rate, args.verbose, topology, traffic, args.log_dir)
+        if args.device_buffer:
+            simulation.set_device_buffers(args.device_buffer)
+        duration = args.duration or 60.0
+        if args.replay:
+            simulation.start_replay(args.replay, args.replay_speed)
+            if args.duration is None:
+                duration = simulation.replay.duration_s() / simulation.replay_speed
+        if args.capture:
+            simulation.start_capture(args.capture)
+        if args.chrome_trace:
+            simulation.start_trace(args.chrome_trace)
+        simulation.run(duration)
+        simulation.stop_capture()
+        simulation.stop_trace()
+        if simulation.session_log:
+            simulation.session_log.close()
+        if args.metrics_csv:
+            simulation.metrics.export_csv(args.metrics_csv, simulation.device_name)
+        if args.metrics_prom:
+            simulation.metrics.export_prometheus(args.metrics_prom, simulation.device_name,
+                                                 simulation.scheduler.now())
+        return
+    
     root = tk.Tk()
-    app = NetworkTerminal(root)
+    app = NetworkTerminal(root, args.console_lines, topology, traffic, args.log_dir or DEFAULT_LOG_DIR,
+                          args.lod_threshold)
+    if args.device_buffer:
+        app.set_device_buffers(args.device_buffer)
+    if args.chrome_trace:
+        app.start_trace(args.chrome_trace)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,300 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from event_scheduler import EventScheduler
+from log_sink import ConsoleLogSink
+from packet_renderer import PacketRenderer
+from session_log import SessionLog
+from switching import benchmark as switch_benchmark
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_terminal_module():
+    """Импорт 'Network terminal.py' (имя файла содержит пробел)"""
+    spec = importlib.util.spec_from_file_location("network_terminal",
+                                                  os.path.join(HERE, "Network terminal.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class HeadlessRoot:
+    """Замена окна Tk без дисплея: after() не планирует вызовов"""
+
+    def after(self, delay_ms, callback, *args):
+        return None
+
+
+class HeadlessCanvas:
+    """Замена холста Tk без дисплея: элементы хранятся в словаре"""
+
+    def __init__(self):
+        self.items = {}
+        self.next_id = 1
+
+    def create_item(self, coords, options):
+        item = self.next_id
+        self.next_id += 1
+        self.items[item] = [list(coords), dict(options)]
+        return item
+
+    def create_oval(self, *coords, **options):
+        return self.create_item(coords, options)
+
+    def create_text(self, *coords, **options):
+        return self.create_item(coords, options)
+
+    def coords(self, item, *coords):
+        self.items[item][0] = list(coords)
+
+    def itemconfig(self, item, **options):
+        self.items[item][1].update(options)
+
+    def delete(self, tag):
+        pass
+
+
+class HeadlessText:
+    """Замена текстового поля консоли без дисплея"""
+
+    def __init__(self):
+        self.lines = []
+
+    def insert(self, index, text):
+        self.lines.extend(text.split("\n")[:-1])
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+def create_widgets(force_headless):
+    """Окно, холст и консоль Tk (виртуальный дисплей) или их замены без дисплея"""
+    if not force_headless:
+        try:
+            import tkinter as tk
+            root = tk.Tk()
+            root.geometry("1400x800")
+            canvas = tk.Canvas(root, width=1000, height=800)
+            canvas.pack()
+            console = tk.Text(root)
+            console.pack()
+            root.update()
+            return "tk", root, canvas, console
+        except Exception:  # нет дисплея (запуск без xvfb-run)
+            pass
+    return "headless", HeadlessRoot(), HeadlessCanvas(), HeadlessText()
+
+
+def noop():
+    """Пустое событие планировщика"""
+
+
+def format_clock(time_ns):
+    """Форматирование времени для теста журнала"""
+    return time.strftime("%H:%M:%S", time.localtime(time_ns / 1e9))
+
+
+def timed(function, *args):
+    """Время выполнения функции, с"""
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def best_of(repeat, function, *args):
+    """Лучший результат из repeat запусков (меньше влияние фоновой нагрузки)"""
+    best = None
+    for _ in range(repeat):
+        result = function(*args)
+        if best is None:
+            best = result
+            continue
+        for key, value in result.items():
+            if key.endswith("_per_s"):
+                best[key] = max(best[key], value)
+            elif "_ms" in key:
+                best[key] = min(best[key], value)
+    return best
+
+
+def bench_generation(terminal, count):
+    """Генерация пакетов: только generate_packet и полный цикл доставки на виртуальных часах"""
+    simulation = terminal.HeadlessSimulation(1000)
+    simulation.running = True
+    # Буферы источников вмещают все пакеты - иначе почти все вызовы отсекаются ограничением буфера
+    simulation.set_device_buffers(count)
+    generate = simulation.generate_packet
+    elapsed = timed(lambda: [generate(1000) for _ in range(count)])
+    created = simulation.total_packets
+    result = {"packets": created, "generate_packets_per_s": created / elapsed}
+
+    duration = count / 100000
+    simulation = terminal.HeadlessSimulation(100000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = timed(simulation.run, duration)
+    result["pipeline_packets_per_s"] = simulation.total_packets / elapsed
+    result["pipeline_events_per_s"] = simulation.scheduler.processed_events / elapsed
+    return result
+
+
+def bench_scheduler(count):
+    """Планировщик: вставка событий в случайном порядке и выполнение всех событий"""
+    scheduler = EventScheduler(virtual=True)
+    times = np.random.default_rng(1).random(count).tolist()
+    schedule_time = timed(lambda: [scheduler.schedule_at(when, noop) for when in times])
+    run_time = timed(scheduler.run_until, float('inf'))
+    return {"events": count,
+            "schedule_per_s": count / schedule_time,
+            "run_per_s": count / run_time,
+            "total_per_s": count / (schedule_time + run_time)}
+
+
+def bench_log_pipeline(root, console, count):
+    """Журнал: постановка в очередь, вывод в консоль и запись в файлы с ротацией"""
+    messages = [f"Пакет #{i}: ПК1 -> ПК2, Размер: 1000 байт" for i in range(count)]
+    now_ns = time.time_ns()
+
+    sink = ConsoleLogSink(root, console, max_pending=count, format_time=format_clock)
+    put_time = timed(lambda: [sink.put(message, now_ns) for message in messages])
+    drain_time = timed(sink.drain)
+
+    with tempfile.TemporaryDirectory() as directory:
+        session_log = SessionLog(directory, format_clock, max_bytes=2**20, max_pending=count)
+        session_put_time = timed(lambda: [session_log.put(now_ns, message) for message in messages])
+        close_time = timed(session_log.close)
+        rotations = session_log.rotations
+
+    return {"messages": count,
+            "console_put_per_s": count / put_time,
+            "console_drain_ms": drain_time * 1000,
+            "session_put_per_s": count / session_put_time,
+            "session_write_per_s": count / max(close_time, 1e-9),
+            "session_rotations": rotations}
+
+
+def bench_switch(count, endpoints=4096):
+    """Решения коммутатора с самообучением"""
+    _, elapsed = switch_benchmark(endpoints, count)
+    return {"endpoints": endpoints, "decisions_per_s": count / elapsed}
+
+
+def bench_canvas(backend, root, canvas, in_flight, frames):
+    """Время кадра отрисовщика при in_flight пакетах в пути"""
+    rng = random.Random(1)
+    renderer = PacketRenderer(root, canvas, capacity=in_flight)
+    for _ in range(in_flight):
+        renderer.add('#FF6B6B', rng.uniform(0, 1000), rng.uniform(0, 800),
+                     rng.uniform(0, 1000), rng.uniform(0, 800), 2.0)
+
+    frame_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        renderer.render_frame(time.monotonic())
+        if backend == "tk":
+            root.update_idletasks()  # перерисовка холста входит во время кадра
+        frame_times.append(time.perf_counter() - start)
+    renderer.clear()
+
+    frame_ms = np.array(frame_times) * 1000
+    return {"in_flight": in_flight, "frames": frames,
+            "frame_ms_mean": float(frame_ms.mean()),
+            "frame_ms_p95": float(np.percentile(frame_ms, 95)),
+            "frame_ms_max": float(frame_ms.max())}
+
+
+def git_commit():
+    """Текущий коммит репозитория (если доступен)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Сравнение с сохраненными результатами: изменение каждого показателя, %"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"Сравнение с {baseline_path} (коммит {baseline.get('commit')}):")
+    for name, values in results["results"].items():
+        old_values = baseline.get("results", {}).get(name, {})
+        for key, value in values.items():
+            old = old_values.get(key)
+            if isinstance(value, float) and old:
+                print(f"  {name}.{key}: {old:,.2f} -> {value:,.2f} ({(value / old - 1) * 100:+.1f}%)")
+
+
+def main():
+    """Запуск набора тестов производительности"""
+    parser = argparse.ArgumentParser(
+        description="Тесты производительности сетевого терминала "
+                    "(для настоящего холста Tk запускать через xvfb-run)")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON-файл результатов")
+    parser.add_argument("--compare", default=None, help="JSON-файл предыдущих результатов")
+    parser.add_argument("--packets", type=int, default=200_000, help="пакетов в тесте генерации")
+    parser.add_argument("--events", type=int, default=500_000, help="событий в тесте планировщика")
+    parser.add_argument("--messages", type=int, default=200_000, help="сообщений в тесте журнала")
+    parser.add_argument("--in-flight", type=int, nargs='+', default=[100, 1000, 5000],
+                        help="число пакетов в пути для теста кадра")
+    parser.add_argument("--frames", type=int, default=60, help="кадров на каждый размер")
+    parser.add_argument("--repeat", type=int, default=3, help="запусков каждого теста (берется лучший)")
+    parser.add_argument("--headless", action="store_true",
+                        help="не использовать дисплей даже при его наличии")
+    args = parser.parse_args()
+
+    random.seed(1)
+    terminal = load_terminal_module()
+    backend, root, canvas, console = create_widgets(args.headless)
+
+    results = {}
+    print("Генерация пакетов...")
+    results["generation"] = best_of(args.repeat, bench_generation, terminal, args.packets)
+    print("Планировщик событий...")
+    results["scheduler"] = best_of(args.repeat, bench_scheduler, args.events)
+    print("Журнал...")
+    results["log_pipeline"] = best_of(args.repeat, bench_log_pipeline, root, console, args.messages)
+    print("Коммутатор...")
+    results["switch"] = best_of(args.repeat, bench_switch, args.packets)
+    for in_flight in args.in_flight:
+        print(f"Кадр холста, {in_flight} пакетов ({backend})...")
+        results[f"canvas_{in_flight}"] = best_of(args.repeat, bench_canvas, backend, root, canvas,
+                                                 in_flight, args.frames)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "canvas_backend": backend,
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"Результаты сохранены: {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
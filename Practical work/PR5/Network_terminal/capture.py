@@ -0,0 +1,121 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# Заголовок файла записи: сигнатура, версия, размер записи, число устройств топологии
+CAPTURE_MAGIC = b"LANCAP"
+CAPTURE_VERSION = 1
+HEADER = struct.Struct("<6sHHI6x")  # 20 байт
+
+# Одна запись - один сгенерированный пакет (14 байт, без выравнивания)
+CAPTURE_DTYPE = np.dtype([
+    ('time_ns', '<i8'),  # время генерации от начала записи, нс
+    ('source', '<u2'),  # индекс устройства-источника
+    ('destination', '<u2'),  # индекс устройства-получателя
+    ('size', '<u2'),  # размер, байт
+])
+
+
+def read_header(f):
+    """Чтение и проверка заголовка, возвращает число устройств топологии"""
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError("Файл записи поврежден: нет заголовка")
+    magic, version, record_size, device_count = HEADER.unpack(data)
+    if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+        raise ValueError("Неизвестный формат файла записи")
+    if record_size != CAPTURE_DTYPE.itemsize:
+        raise ValueError(f"Неверный размер записи: {record_size}")
+    return device_count
+
+
+class CaptureWriter:
+    """Запись потока пакетов в двоичный файл (только дозапись, буферизованная)"""
+
+    def __init__(self, path, device_count, buffer_records=4096):
+        self.path = path
+        self.device_count = device_count
+        self.buffer_records = buffer_records
+        self.buffer = []
+        self.start_time = None
+        self.time_offset_ns = 0
+        self.records_written = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Продолжение существующей записи: время отсчитывается после последнего пакета
+            with open(path, 'rb') as f:
+                if read_header(f) != device_count:
+                    raise ValueError("Запись сделана для другой топологии")
+            reader = CaptureReader(path)
+            if len(reader):
+                self.time_offset_ns = int(reader.records['time_ns'][-1])
+            self.records_written = len(reader)
+            reader.close()
+            self.file = open(path, 'ab')
+            # Отбрасываем недописанный хвост (например, после аварийного завершения)
+            self.file.truncate(HEADER.size + self.records_written * CAPTURE_DTYPE.itemsize)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION,
+                                        CAPTURE_DTYPE.itemsize, device_count))
+
+    def record(self, now, source, destination, size):
+        """Добавление пакета, сгенерированного в момент now (с)"""
+        if self.start_time is None:
+            self.start_time = now
+        time_ns = self.time_offset_ns + int((now - self.start_time) * 1_000_000_000)
+        self.buffer.append((time_ns, source, destination, size))
+        if len(self.buffer) >= self.buffer_records:
+            self.flush()
+
+    def flush(self):
+        """Сброс буфера в файл одной операцией записи"""
+        if self.buffer:
+            self.file.write(np.array(self.buffer, dtype=CAPTURE_DTYPE).tobytes())
+            self.records_written += len(self.buffer)
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        """Завершение записи"""
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class CaptureReader:
+    """Чтение файла записи через mmap: страницы подгружаются по мере воспроизведения"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.device_count = read_header(self.file)
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        count = (len(self.map) - HEADER.size) // CAPTURE_DTYPE.itemsize
+        # Представление над отображенным файлом - данные не копируются в память
+        self.records = np.frombuffer(self.map, dtype=CAPTURE_DTYPE, count=count,
+                                     offset=HEADER.size)
+
+    def __len__(self):
+        return len(self.records)
+
+    def duration_s(self):
+        """Длительность записи, с"""
+        if not len(self.records):
+            return 0.0
+        return (int(self.records['time_ns'][-1]) - int(self.records['time_ns'][0])) / 1e9
+
+    def iter_records(self, chunk_size=4096):
+        """Последовательный обход записей (time_ns, source, destination, size) блоками"""
+        records = self.records
+        for start in range(0, len(records), chunk_size):
+            # tolist() блока - кортежи Python без обращения к numpy на каждый пакет
+            yield from records[start:start + chunk_size].tolist()
+
+    def close(self):
+        """Освобождение отображения файла"""
+        self.records = None
+        self.map.close()
+        self.file.close()
@@ -0,0 +1,78 @@
+import heapq
+import itertools
+import time
+
+
+class EventScheduler:
+    """Планировщик дискретных событий на основе очереди с приоритетом"""
+
+    def __init__(self, virtual=False, start_time=0.0):
+        # virtual=True - виртуальное время (для безголового режима),
+        # иначе используется монотонное реальное время
+        self.virtual = virtual
+        self.virtual_time = start_time
+        self.events = []
+        self.counter = itertools.count()
+        self.processed_events = 0
+
+    def now(self):
+        """Текущее время планировщика в секундах"""
+        if self.virtual:
+            return self.virtual_time
+        return time.monotonic()
+
+    def schedule(self, delay, callback, *args):
+        """Планирование события через delay секунд"""
+        return self.schedule_at(self.now() + delay, callback, *args)
+
+    def schedule_at(self, when, callback, *args):
+        """Планирование события на момент времени when"""
+        # Порядковый номер сохраняет порядок событий с одинаковым временем
+        event = [when, next(self.counter), callback, args]
+        heapq.heappush(self.events, event)
+        return event
+
+    def cancel(self, event):
+        """Отмена события (ленивое удаление из очереди)"""
+        event[2] = None
+
+    def clear(self):
+        """Удаление всех запланированных событий"""
+        self.events.clear()
+
+    def next_event_time(self):
+        """Время ближайшего события или None"""
+        return self.events[0][0] if self.events else None
+
+    def run_due(self, limit=None):
+        """Выполнение всех событий, время которых уже наступило"""
+        now = self.now()
+        events = self.events
+        processed = 0
+        while events and events[0][0] <= now:
+            _, _, callback, args = heapq.heappop(events)
+            if callback is None:
+                continue
+            callback(*args)
+            processed += 1
+            if limit is not None and processed >= limit:
+                break
+        self.processed_events += processed
+        return processed
+
+    def run_until(self, end_time):
+        """Выполнение событий на виртуальной оси времени до end_time"""
+        events = self.events
+        processed = 0
+        while events and events[0][0] <= end_time:
+            when, _, callback, args = heapq.heappop(events)
+            if callback is None:
+                continue
+            self.virtual_time = when
+            callback(*args)
+            processed += 1
+        # При end_time = inf (выполнить все события) часы остаются на последнем событии
+        if self.virtual_time < end_time != float('inf'):
+            self.virtual_time = end_time
+        self.processed_events += processed
+        return processed
@@ -0,0 +1,85 @@
+from collections import deque
+
+# Параметры канала по умолчанию
+DEFAULT_BANDWIDTH_BPS = 10_000_000  # 10 Мбит/с
+DEFAULT_PROPAGATION_S = 0.0005  # 0.5 мс
+DEFAULT_BUFFER_PACKETS = 64
+
+
+class LinkPort:
+    """Выходной порт канала в одном направлении: FIFO-очередь с отбрасыванием хвоста"""
+
+    def __init__(self, link, source, target):
+        self.link = link
+        self.source = source
+        self.target = target
+        self.reset()
+
+    def reset(self):
+        """Сброс очереди и счетчиков"""
+        self.flush()
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.drops = 0
+        self.busy_time = 0.0
+        self.sampled_busy_time = 0.0
+        self.sampled_at = None
+        self.utilization = 0.0
+
+    def flush(self):
+        """Очистка очереди без сброса счетчиков"""
+        self.busy_until = 0.0  # момент окончания передачи последнего пакета в очереди
+        self.departures = deque()  # моменты окончания передачи пакетов в очереди
+
+    def queue_depth(self, now):
+        """Число пакетов в очереди порта (включая передаваемый)"""
+        departures = self.departures
+        while departures and departures[0] <= now:
+            departures.popleft()
+        return len(departures)
+
+    def enqueue(self, now, size):
+        """Постановка пакета в очередь, возвращает момент окончания передачи или None при отбрасывании"""
+        if self.queue_depth(now) >= self.link.buffer_packets:
+            self.drops += 1
+            return None
+
+        transmission = size * 8 / self.link.bandwidth_bps
+        departure = max(now, self.busy_until) + transmission
+        self.busy_until = departure
+        self.departures.append(departure)
+        self.packets_sent += 1
+        self.bytes_sent += size
+        self.busy_time += transmission
+        return departure
+
+    def sample(self, now):
+        """Загрузка канала с момента предыдущего замера (доля времени передачи)"""
+        if self.sampled_at is not None and now > self.sampled_at:
+            self.utilization = min(1.0, (self.busy_time - self.sampled_busy_time) / (now - self.sampled_at))
+        self.sampled_busy_time = self.busy_time
+        self.sampled_at = now
+        return self.utilization
+
+
+class Link:
+    """Канал связи между двумя устройствами"""
+
+    def __init__(self, a, b, bandwidth_bps=DEFAULT_BANDWIDTH_BPS,
+                 propagation_s=DEFAULT_PROPAGATION_S, buffer_packets=DEFAULT_BUFFER_PACKETS):
+        self.a = a
+        self.b = b
+        self.bandwidth_bps = bandwidth_bps
+        self.propagation_s = propagation_s
+        self.buffer_packets = buffer_packets
+        self.ports = (LinkPort(self, a, b), LinkPort(self, b, a))
+
+    def reset(self):
+        """Сброс очередей и счетчиков обоих направлений"""
+        for port in self.ports:
+            port.reset()
+
+    def flush(self):
+        """Очистка очередей обоих направлений"""
+        for port in self.ports:
+            port.flush()
@@ -0,0 +1,81 @@
+import threading
+import tkinter as tk
+from collections import deque
+
+
+class ConsoleLogSink:
+    """Пакетный вывод журнала в консоль с ограничением числа строк"""
+
+    def __init__(self, root, console, max_lines=2000, max_pending=20000, interval_ms=100,
+                 format_time=None):
+        self.root = root
+        self.console = console
+        self.format_time = format_time  # время модели в нс -> строка (вызывается при выводе)
+        self.max_lines = max_lines
+        self.max_pending = max_pending
+        self.interval_ms = interval_ms
+
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.dropped_messages = 0
+        self.written_messages = 0
+
+    def put(self, message, time_ns=None):
+        """Постановка сообщения в очередь (при переполнении оно отбрасывается)"""
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                self.dropped_messages += 1
+                return
+            self.pending.append((time_ns, message))
+
+    def clear(self):
+        """Удаление сообщений, ожидающих вывода"""
+        with self.lock:
+            self.pending.clear()
+
+    def start(self):
+        """Запуск периодического вывода в главном потоке Tk"""
+        self.root.after(self.interval_ms, self.tick)
+
+    def tick(self):
+        """Вывод накопленных сообщений и планирование следующего вывода"""
+        self.drain()
+        self.root.after(self.interval_ms, self.tick)
+
+    def drain(self):
+        """Вывод всех накопленных сообщений одним блоком"""
+        with self.lock:
+            if not self.pending:
+                return
+            messages = self.pending
+            self.pending = deque()
+
+        # Из большого пакета в консоль попадут только последние max_lines строк,
+        # остальные считаются отброшенными
+        excess = len(messages) - self.max_lines
+        if excess > 0:
+            for _ in range(excess):
+                messages.popleft()
+            with self.lock:
+                self.dropped_messages += excess
+
+        # Время форматируется только для строк, которые действительно выводятся
+        format_time = self.format_time
+        lines = [message if time_ns is None or format_time is None
+                 else f"[{format_time(time_ns)}] {message}"
+                 for time_ns, message in messages]
+        self.console.insert(tk.END, "\n".join(lines) + "\n")
+        self.written_messages += len(messages)
+        self.trim()
+        self.console.see(tk.END)
+
+    def trim(self):
+        """Удаление старых строк сверх max_lines"""
+        line_count = int(self.console.index("end-1c").split(".")[0])
+        excess = line_count - self.max_lines
+        if excess > 0:
+            self.console.delete("1.0", f"{excess + 1}.0")
+
+    def stats_text(self):
+        """Строка статистики журнала"""
+        return f"Журнал: выведено {self.written_messages}, отброшено {self.dropped_messages}"
@@ -0,0 +1,282 @@
+import csv
+import itertools
+
+# Логарифмически-линейные корзины: 32 корзины на каждую степень двойки (точность ~3%)
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_SHIFT = 40  # значения до ~2^45 мкс (больше года)
+BUCKET_COUNT = 2 * SUB_BUCKETS + MAX_SHIFT * SUB_BUCKETS
+
+# Границы корзин гистограммы для экспорта в формате Prometheus, с
+PROMETHEUS_BOUNDS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+                     0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0]
+
+# Окна расчета пропускной способности, с
+THROUGHPUT_WINDOWS = (1, 10, 60)
+
+
+def bucket_index(value):
+    """Номер корзины для значения (целые микросекунды)"""
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return 2 * SUB_BUCKETS + (shift - 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_upper_bound(index):
+    """Наибольшее значение, попадающее в корзину"""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = (index - 2 * SUB_BUCKETS) // SUB_BUCKETS + 1
+    mantissa = (index - 2 * SUB_BUCKETS) % SUB_BUCKETS + SUB_BUCKETS
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Гистограмма задержек в стиле HDR: запись за O(1), фиксированный объем памяти"""
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value_us):
+        """Запись одной задержки, мкс"""
+        value_us = min(int(value_us), bucket_upper_bound(BUCKET_COUNT - 1))
+        self.counts[bucket_index(value_us)] += 1
+        self.count += 1
+        self.total += value_us
+        if self.min is None or value_us < self.min:
+            self.min = value_us
+        if value_us > self.max:
+            self.max = value_us
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Гистограмма по готовым счетчикам корзин (сумма и минимум не восстанавливаются)"""
+        histogram = cls()
+        histogram.counts = [int(c) for c in counts]
+        histogram.count = sum(histogram.counts)
+        nonzero = [i for i, c in enumerate(histogram.counts) if c]
+        if nonzero:
+            histogram.min = bucket_upper_bound(nonzero[0])
+            histogram.max = bucket_upper_bound(nonzero[-1])
+        return histogram
+
+    def copy(self):
+        """Независимая копия гистограммы"""
+        histogram = LatencyHistogram.__new__(LatencyHistogram)
+        histogram.__dict__.update(self.__dict__, counts=list(self.counts))
+        return histogram
+
+    def __getstate__(self):
+        """Состояние для передачи между процессами: только непустые корзины
+        (гистограмм по парам устройств тысячи, и почти все их корзины пусты)"""
+        nonzero = list(itertools.compress(range(BUCKET_COUNT), self.counts))
+        return dict(self.__dict__, counts=(nonzero, [self.counts[i] for i in nonzero]))
+
+    def __setstate__(self, state):
+        counts = [0] * BUCKET_COUNT
+        for index, count in zip(*state["counts"]):
+            counts[index] = count
+        self.__dict__.update(state, counts=counts)
+
+    def merge(self, other):
+        """Добавление значений другой гистограммы"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def mean(self):
+        """Средняя задержка, мкс"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Задержка p-го процентиля, мкс (верхняя граница корзины)"""
+        if not self.count:
+            return 0
+        target = max(1, int(self.count * p / 100 + 0.5))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= target:
+                return min(bucket_upper_bound(index), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds_us):
+        """Число значений не больше каждой из границ (для экспорта)"""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds_us:
+            while index < BUCKET_COUNT and bucket_upper_bound(index) <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+
+class ThroughputCounter:
+    """Счетчик пакетов и байт по секундам для скользящих окон 1/10/60 с"""
+
+    def __init__(self, slots=max(THROUGHPUT_WINDOWS) + 1):
+        self.slots = slots
+        self.packets = [0] * slots
+        self.bytes = [0] * slots
+        self.current_second = None
+
+    def advance(self, second):
+        """Переход к новой секунде с обнулением устаревших ячеек"""
+        if self.current_second is None:
+            self.current_second = second
+            return
+        steps = min(second - self.current_second, self.slots)
+        for step in range(1, steps + 1):
+            slot = (self.current_second + step) % self.slots
+            self.packets[slot] = 0
+            self.bytes[slot] = 0
+        self.current_second = max(self.current_second, second)
+
+    def record(self, now, size):
+        """Учет одного пакета в момент now, с"""
+        second = int(now)
+        if second != self.current_second:
+            self.advance(second)
+        slot = second % self.slots
+        self.packets[slot] += 1
+        self.bytes[slot] += size
+
+    def merge(self, other):
+        """Добавление счетчиков другого экземпляра (ячейки выравниваются по секундам)"""
+        if other.current_second is None:
+            return
+        self.advance(other.current_second)
+        # Секунды, еще не вытесненные из окна обоих счетчиков
+        for second in range(self.current_second - self.slots + 1, other.current_second + 1):
+            slot = second % self.slots
+            self.packets[slot] += other.packets[slot]
+            self.bytes[slot] += other.bytes[slot]
+
+    def rate(self, window, now):
+        """Пакетов и байт в секунду за последние window завершенных секунд"""
+        self.advance(int(now))
+        if self.current_second is None:
+            return 0.0, 0.0
+        packets = 0
+        size = 0
+        for step in range(1, window + 1):
+            slot = (self.current_second - step) % self.slots
+            packets += self.packets[slot]
+            size += self.bytes[slot]
+        return packets / window, size / window
+
+
+class MetricsRegistry:
+    """Метрики доставки: гистограммы задержек по парам источник-получатель и пропускная способность"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Сброс всех метрик"""
+        self.histograms = {}  # (источник, получатель) -> LatencyHistogram
+        self.total = LatencyHistogram()
+        self.throughput = ThroughputCounter()
+        self.delivered = 0
+        self.dropped = 0
+
+    def record_delivery(self, source, destination, latency_ns, size, now):
+        """Учет доставленного пакета (индексы устройств, задержка в нс, время модели в с)"""
+        key = (source, destination)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        latency_us = latency_ns // 1000
+        histogram.record(latency_us)
+        self.total.record(latency_us)
+        self.throughput.record(now, size)
+        self.delivered += 1
+
+    def merge(self, other):
+        """Объединение метрик (например, частей распределенной имитации)"""
+        for key, histogram in other.histograms.items():
+            own = self.histograms.get(key)
+            if own is None:
+                # Пары источник-получатель обычно не пересекаются - копия вместо сложения
+                self.histograms[key] = histogram.copy()
+            else:
+                own.merge(histogram)
+        self.total.merge(other.total)
+        self.throughput.merge(other.throughput)
+        self.delivered += other.delivered
+        self.dropped += other.dropped
+
+    def record_drop(self):
+        """Учет отброшенного пакета"""
+        self.dropped += 1
+
+    def summary_lines(self, now):
+        """Строки для панели живых метрик"""
+        lines = ["МЕТРИКИ"]
+        rates = [self.throughput.rate(window, now) for window in THROUGHPUT_WINDOWS]
+        lines.append("Пакетов/с: " + ", ".join(
+            f"{window}с {packets:.1f}" for window, (packets, _) in zip(THROUGHPUT_WINDOWS, rates)))
+        lines.append("Кбит/с: " + ", ".join(
+            f"{window}с {size * 8 / 1000:.1f}" for window, (_, size) in zip(THROUGHPUT_WINDOWS, rates)))
+        total = self.total
+        lines.append(f"Задержка, мс: p50 {total.percentile(50) / 1000:.2f}, "
+                     f"p99 {total.percentile(99) / 1000:.2f}, макс {total.max / 1000:.2f}")
+        lines.append(f"Доставлено: {self.delivered}, отброшено: {self.dropped}")
+        return lines
+
+    def export_csv(self, path, device_name):
+        """Сводка гистограмм по парам источник-получатель в CSV"""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["source", "destination", "count", "min_ms", "mean_ms",
+                             "p50_ms", "p90_ms", "p99_ms", "p999_ms", "max_ms"])
+            for (source, destination), h in sorted(self.histograms.items()):
+                writer.writerow([
+                    device_name(source), device_name(destination), h.count,
+                    f"{(h.min or 0) / 1000:.3f}", f"{h.mean() / 1000:.3f}",
+                    f"{h.percentile(50) / 1000:.3f}", f"{h.percentile(90) / 1000:.3f}",
+                    f"{h.percentile(99) / 1000:.3f}", f"{h.percentile(99.9) / 1000:.3f}",
+                    f"{h.max / 1000:.3f}",
+                ])
+
+    def export_prometheus(self, path, device_name, now):
+        """Экспорт метрик в текстовом формате Prometheus"""
+        bounds_us = [int(bound * 1_000_000) for bound in PROMETHEUS_BOUNDS]
+        lines = [
+            "# HELP lan_packet_latency_seconds Задержка доставки пакета.",
+            "# TYPE lan_packet_latency_seconds histogram",
+        ]
+        for (source, destination), h in sorted(self.histograms.items()):
+            labels = f'source="{device_name(source)}",destination="{device_name(destination)}"'
+            for bound, count in zip(PROMETHEUS_BOUNDS, h.cumulative_counts(bounds_us)):
+                lines.append(f'lan_packet_latency_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'lan_packet_latency_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"lan_packet_latency_seconds_sum{{{labels}}} {h.total / 1_000_000}")
+            lines.append(f"lan_packet_latency_seconds_count{{{labels}}} {h.count}")
+
+        lines += [
+            "# HELP lan_packets_delivered_total Доставлено пакетов.",
+            "# TYPE lan_packets_delivered_total counter",
+            f"lan_packets_delivered_total {self.delivered}",
+            "# HELP lan_packets_dropped_total Отброшено пакетов.",
+            "# TYPE lan_packets_dropped_total counter",
+            f"lan_packets_dropped_total {self.dropped}",
+            "# HELP lan_throughput_packets_per_second Пропускная способность за окно.",
+            "# TYPE lan_throughput_packets_per_second gauge",
+        ]
+        for window in THROUGHPUT_WINDOWS:
+            packets, _ = self.throughput.rate(window, now)
+            lines.append(f'lan_throughput_packets_per_second{{window="{window}s"}} {packets}')
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,171 @@
+import time
+import numpy as np
+
+
+class PacketRenderer:
+    """Покадровая отрисовка всех пакетов в пути за один проход
+
+    Элементы холста для пакетов создаются один раз (скрытый пул) и переиспользуются
+    через itemconfig/coords. Пакеты сверх размера пула не рисуются, а учитываются
+    в общем маркере "+N в пути", поэтому работа холста ограничена при любой скорости.
+    """
+
+    def __init__(self, root, canvas, clock=time.monotonic, fps=30, radius=15, capacity=512,
+                 viewport=None):
+        self.root = root
+        self.canvas = canvas
+        self.clock = clock
+        self.viewport = viewport  # Преобразование мировых координат в координаты холста
+        self.fps = fps
+        self.frame_interval = 1.0 / fps
+        self.radius = radius
+
+        # Параметры текущего отрезка движения каждого пакета (по слотам)
+        self.capacity = capacity
+        self.start_xy = np.zeros((capacity, 2))
+        self.end_xy = np.zeros((capacity, 2))
+        self.start_time = np.zeros(capacity)
+        self.duration = np.ones(capacity)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.free_slots = list(range(capacity - 1, -1, -1))
+
+        # Пакеты, не поместившиеся в пул
+        self.overflow = 0
+        self.shown_overflow = 0
+        self.create_items()
+
+        # Статистика кадров
+        self.running = False
+        self.frame_count = 0
+        self.dropped_frames = 0
+        self.last_frame_time = 0.0
+        self.max_frame_time = 0.0
+        self.last_tick = None
+
+    def create_items(self):
+        """Создание скрытого пула элементов холста (также после очистки холста)"""
+        self.items = [
+            self.canvas.create_oval(0, 0, 0, 0, outline='white', width=2,
+                                    state='hidden', tags=("packet",))
+            for _ in range(self.capacity)
+        ]
+        self.overflow_item = self.canvas.create_text(
+            10, 10, anchor='nw', text="", fill='#FFD166', font=('Consolas', 10, 'bold'),
+            state='hidden', tags=("packet",))
+        self.shown_overflow = 0
+        for slot in np.flatnonzero(self.active).tolist():
+            self.active[slot] = False
+            self.free_slots.append(slot)
+
+    def add(self, color, x0, y0, x1, y1, duration):
+        """Показ пакета из пула и задание первого отрезка движения (None - пул исчерпан)"""
+        if not self.free_slots:
+            self.overflow += 1
+            return None
+        slot = self.free_slots.pop()
+        self.active[slot] = True
+        self.set_segment(slot, x0, y0, x1, y1, duration)
+        self.canvas.itemconfig(self.items[slot], fill=color, state='normal')
+        self.place(slot, x0, y0)
+        return slot
+
+    def release_overflow(self):
+        """Завершение пакета, не поместившегося в пул"""
+        self.overflow = max(0, self.overflow - 1)
+
+    def place(self, slot, x, y):
+        """Немедленная установка элемента в точку мировых координат"""
+        if self.viewport is not None:
+            x, y = self.viewport.to_screen(x, y)
+        r = self.radius
+        self.canvas.coords(self.items[slot], x - r, y - r, x + r, y + r)
+
+    def set_segment(self, slot, x0, y0, x1, y1, duration):
+        """Новый отрезок движения пакета (duration=0 - неподвижный пакет)"""
+        self.start_xy[slot] = (x0, y0)
+        self.end_xy[slot] = (x1, y1)
+        self.start_time[slot] = self.clock()
+        self.duration[slot] = max(duration, 1e-6)
+
+    def remove(self, slot):
+        """Скрытие пакета и возврат элемента в пул"""
+        if not self.active[slot]:
+            return
+        self.canvas.itemconfig(self.items[slot], state='hidden')
+        self.active[slot] = False
+        self.free_slots.append(slot)
+
+    def clear(self):
+        """Скрытие всех пакетов"""
+        for slot in np.flatnonzero(self.active).tolist():
+            self.remove(slot)
+        self.overflow = 0
+
+    def in_flight(self):
+        """Количество пакетов в пути (включая не поместившиеся в пул)"""
+        return self.capacity - len(self.free_slots) + self.overflow
+
+    def start(self):
+        """Запуск покадровой отрисовки"""
+        if not self.running:
+            self.running = True
+            self.last_tick = None
+            self.root.after(0, self.tick)
+
+    def stop(self):
+        """Остановка покадровой отрисовки"""
+        self.running = False
+
+    def tick(self):
+        """Один кадр: расчет позиций и обновление холста"""
+        if not self.running:
+            return
+
+        frame_start = self.clock()
+        if self.last_tick is not None:
+            # Кадры, которые не успели отрисоваться вовремя
+            late = int((frame_start - self.last_tick) / self.frame_interval) - 1
+            if late > 0:
+                self.dropped_frames += late
+        self.last_tick = frame_start
+
+        self.render_frame(frame_start)
+
+        frame_time = self.clock() - frame_start
+        self.frame_count += 1
+        self.last_frame_time = frame_time
+        self.max_frame_time = max(self.max_frame_time, frame_time)
+
+        delay_ms = max(1, int((self.frame_interval - frame_time) * 1000))
+        self.root.after(delay_ms, self.tick)
+
+    def render_frame(self, now):
+        """Векторный расчет позиций всех пакетов и обновление холста"""
+        if self.overflow != self.shown_overflow:
+            # Маркер обновляется только при изменении числа
+            self.shown_overflow = self.overflow
+            self.canvas.itemconfig(self.overflow_item, text=f"+{self.overflow} в пути",
+                                   state='normal' if self.overflow else 'hidden')
+
+        slots = np.flatnonzero(self.active)
+        if not len(slots):
+            return
+
+        t = np.clip((now - self.start_time[slots]) / self.duration[slots], 0.0, 1.0)
+        start = self.start_xy[slots]
+        positions = start + (self.end_xy[slots] - start) * t[:, None]
+        if self.viewport is not None:
+            positions = positions * self.viewport.scale + (self.viewport.offset_x, self.viewport.offset_y)
+        boxes = np.hstack([positions - self.radius, positions + self.radius])
+
+        coords = self.canvas.coords
+        items = self.items
+        for slot, box in zip(slots.tolist(), boxes.tolist()):
+            coords(items[slot], *box)
+
+    def stats_text(self):
+        """Строка статистики отрисовки"""
+        return (f"Кадр: {self.last_frame_time * 1000:.1f} мс "
+                f"(макс {self.max_frame_time * 1000:.1f}), "
+                f"пропущено: {self.dropped_frames}, в пути: {self.in_flight()} "
+                f"(вне пула: {self.overflow})")
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Одна запись доставленного пакета: 27 байт (1 млн пакетов ~ 27 МБ)
+PACKET_DTYPE = np.dtype([
+    ('id', np.uint32),
+    ('source', np.uint16),
+    ('destination', np.uint16),
+    ('size', np.uint16),
+    ('color', np.uint8),
+    ('sent_ns', np.int64),
+    ('delivered_ns', np.int64),
+])
+
+
+class PacketStore:
+    """Компактная колоночная история доставленных пакетов"""
+
+    def __init__(self, chunk_size=65536):
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, packet):
+        """Добавление доставленного пакета в историю"""
+        offset = self.count % self.chunk_size
+        if offset == 0:
+            self.chunks.append(np.zeros(self.chunk_size, dtype=PACKET_DTYPE))
+        self.chunks[-1][offset] = (packet.id, packet.source, packet.destination, packet.size,
+                                   packet.color_index, packet.sent_ns, packet.delivered_ns)
+        self.count += 1
+
+    def records(self):
+        """Все записи истории одним структурированным массивом"""
+        if not self.chunks:
+            return np.zeros(0, dtype=PACKET_DTYPE)
+        data = np.concatenate(self.chunks)
+        return data[:self.count]
+
+    def column(self, name):
+        """Отдельная колонка истории"""
+        return self.records()[name]
+
+    def delays_ms(self):
+        """Задержки доставки всех пакетов истории, мс"""
+        data = self.records()
+        return (data['delivered_ns'] - data['sent_ns']) // 1_000_000
+
+    def memory_bytes(self):
+        """Объем памяти, занятый историей"""
+        return sum(chunk.nbytes for chunk in self.chunks)
+
+    def clear(self):
+        """Очистка истории"""
+        self.chunks = []
+        self.count = 0
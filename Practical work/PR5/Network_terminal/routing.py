@@ -0,0 +1,123 @@
+from collections import deque
+
+from link_model import Link
+
+
+class NetworkTopology:
+    """Реестр устройств сети и таблицы маршрутизации по кратчайшему пути"""
+
+    def __init__(self):
+        self.devices = []
+        self.index = {}  # имя устройства -> индекс
+        self.adjacency = []  # списки смежности по индексам устройств
+        self.links = []  # пары индексов соединенных устройств
+        self.link_models = []  # параметры и очереди каналов (параллельно links)
+        self.ports = {}  # (откуда, куда) -> выходной порт канала
+        self.version = 0
+
+        # Кэш таблиц продвижения и маршрутов (сбрасывается при изменении топологии)
+        self.forwarding_tables = {}
+        self.paths = {}
+
+    def add_device(self, device):
+        """Добавление устройства, возвращает его индекс"""
+        if device.name in self.index:
+            raise ValueError(f"Устройство {device.name} уже существует")
+        device_index = len(self.devices)
+        self.devices.append(device)
+        self.index[device.name] = device_index
+        self.adjacency.append([])
+        self.invalidate()
+        return device_index
+
+    def add_link(self, name_a, name_b, **link_params):
+        """Соединение двух устройств по именам (link_params - параметры Link)"""
+        a = self.index[name_a]
+        b = self.index[name_b]
+        self.devices[a].add_connection(self.devices[b])
+        self.devices[b].add_connection(self.devices[a])
+        self.adjacency[a].append(b)
+        self.adjacency[b].append(a)
+        self.links.append((a, b))
+
+        link = Link(a, b, **link_params)
+        self.link_models.append(link)
+        self.ports[(a, b)], self.ports[(b, a)] = link.ports
+        self.invalidate()
+
+    def reset_links(self):
+        """Сброс очередей и счетчиков всех каналов"""
+        for link in self.link_models:
+            link.reset()
+
+    def flush_links(self):
+        """Очистка очередей всех каналов (счетчики сохраняются)"""
+        for link in self.link_models:
+            link.flush()
+
+    def invalidate(self):
+        """Сброс кэша маршрутов после изменения топологии"""
+        self.version += 1
+        self.forwarding_tables.clear()
+        self.paths.clear()
+
+    def device(self, name):
+        """Устройство по имени"""
+        return self.devices[self.index[name]]
+
+    def device_index(self, name):
+        """Индекс устройства по имени"""
+        return self.index[name]
+
+    def hosts(self):
+        """Индексы конечных устройств (компьютеров)"""
+        return [i for i, d in enumerate(self.devices) if d.type == 'pc']
+
+    def forwarding_table(self, destination):
+        """Следующий узел на пути к destination для каждого устройства (-1 - недостижимо)"""
+        table = self.forwarding_tables.get(destination)
+        if table is not None:
+            return table
+
+        # Поиск в ширину от получателя: сосед, из которого узел был достигнут,
+        # и есть следующий узел на кратчайшем пути к получателю
+        table = [-1] * len(self.devices)
+        table[destination] = destination
+        queue = deque([destination])
+        while queue:
+            node = queue.popleft()
+            # Компьютеры не передают чужой трафик дальше
+            if node != destination and self.devices[node].type == 'pc':
+                continue
+            for neighbor in self.adjacency[node]:
+                if table[neighbor] == -1:
+                    table[neighbor] = node
+                    queue.append(neighbor)
+
+        self.forwarding_tables[destination] = table
+        return table
+
+    def next_hop(self, node, destination):
+        """Следующий узел от node к destination"""
+        return self.forwarding_table(destination)[node]
+
+    def path(self, source, destination):
+        """Маршрут как кортеж индексов устройств или None"""
+        key = (source, destination)
+        route = self.paths.get(key)
+        if route is not None or key in self.paths:
+            return route
+
+        table = self.forwarding_table(destination)
+        if table[source] == -1:
+            route = None
+        else:
+            route = [source]
+            node = source
+            while node != destination:
+                node = table[node]
+                route.append(node)
+            route = tuple(route)
+
+        self.paths[key] = route
+        return route
@@ -0,0 +1,118 @@
+import gzip
+import os
+import shutil
+import threading
+from collections import deque
+
+
+class SessionLog:
+    """Журнал сессии на диске: запись в фоновом потоке с ротацией и сжатием файлов
+
+    Производитель только добавляет (время, сообщение) в очередь; форматирование
+    времени, объединение строк и запись выполняются потоком записи.
+    """
+
+    def __init__(self, directory, format_time, base_name="network_terminal", max_bytes=5 * 2**20,
+                 backup_count=10, interval=0.25, max_pending=200000):
+        self.directory = directory
+        self.format_time = format_time  # время модели в нс -> строка
+        self.path = os.path.join(directory, base_name + ".log")
+        self.base_name = base_name
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.interval = interval
+        self.max_pending = max_pending
+
+        self.pending = deque()  # append/popleft потокобезопасны
+        self.dropped_messages = 0
+        self.written_messages = 0
+        self.rotations = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.size = self.file.tell()
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="session-log", daemon=True)
+        self.thread.start()
+
+    def put(self, time_ns, message):
+        """Постановка сообщения в очередь (time_ns=None - без отметки времени)"""
+        if len(self.pending) >= self.max_pending:
+            self.dropped_messages += 1
+            return
+        self.pending.append((time_ns, message))
+
+    def run(self):
+        """Цикл потока записи: пакетная запись раз в interval секунд"""
+        while not self.stop_event.wait(self.interval):
+            self.write_pending()
+        self.write_pending()
+
+    def write_pending(self):
+        """Форматирование и запись всех накопленных сообщений одним блоком"""
+        pending = self.pending
+        count = len(pending)
+        if not count:
+            return
+
+        format_time = self.format_time
+        lines = []
+        last_ns = None
+        last_text = ""
+        for _ in range(count):
+            time_ns, message = pending.popleft()
+            if time_ns is None:
+                lines.append(message)
+                continue
+            # Соседние события часто приходятся на одну миллисекунду
+            if time_ns // 1_000_000 != last_ns:
+                last_ns = time_ns // 1_000_000
+                last_text = format_time(time_ns)
+            lines.append(f"[{last_text}] {message}")
+
+        text = "\n".join(lines) + "\n"
+        self.file.write(text)
+        self.file.flush()
+        self.size += len(text.encode('utf-8'))
+        self.written_messages += count
+
+        if self.size >= self.max_bytes:
+            self.rotate()
+
+    def backup_path(self, number):
+        """Путь к сжатой копии с номером number (1 - самая новая)"""
+        return os.path.join(self.directory, f"{self.base_name}.{number}.log.gz")
+
+    def rotate(self):
+        """Сжатие заполненного файла и начало нового"""
+        self.file.close()
+
+        # Сдвиг старых копий: .1 -> .2 и т. д., самая старая удаляется
+        oldest = self.backup_path(self.backup_count)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for number in range(self.backup_count - 1, 0, -1):
+            source = self.backup_path(number)
+            if os.path.exists(source):
+                os.replace(source, self.backup_path(number + 1))
+
+        with open(self.path, 'rb') as src, gzip.open(self.backup_path(1), 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self.size = 0
+        self.rotations += 1
+
+    def close(self):
+        """Запись оставшихся сообщений и остановка потока"""
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.file.close()
+
+    def stats_text(self):
+        """Строка статистики журнала сессии"""
+        return (f"Файл журнала: записано {self.written_messages}, отброшено {self.dropped_messages}, "
+                f"ротаций {self.rotations}")
@@ -0,0 +1,255 @@
+import heapq
+import itertools
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from metrics import BUCKET_COUNT
+
+# Пакет, переходящий в другую часть сети (прибытие из previous на устройство node в момент arrival)
+SHARD_RECORD_DTYPE = np.dtype([
+    ('id', '<u4'),
+    ('source', '<u4'),
+    ('destination', '<u4'),
+    ('size', '<u2'),
+    ('color', 'u1'),
+    ('previous', '<u4'),
+    ('node', '<u4'),
+    ('sent_ns', '<i8'),
+    ('arrival', '<f8'),
+])
+
+# Поля строки живой статистики части сети
+STAT_FIELDS = ('virtual_time', 'generated', 'delivered', 'dropped', 'sent_cross',
+               'received_cross', 'events', 'cpu_time', 'done')
+STATS_HEADER = 4  # число частей, длительность, признак завершения, резерв
+
+
+def attach_memory(name, external=False):
+    """Подключение к существующему блоку общей памяти
+
+    Процессы частей используют трекер ресурсов координатора. Внешний процесс
+    (окно наблюдения) снимает блок со своего учета, иначе его трекер удалил бы
+    блок при завершении окна.
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    if external:
+        resource_tracker.unregister(memory._name, "shared_memory")
+    return memory
+
+
+def partition_topology(topology, shards):
+    """Разбиение устройств на части: коммутаторы в порядке обхода от коротких каналов
+    к длинным (близкие коммутаторы вместе) делятся на группы с примерно равным числом
+    устройств, компьютеры следуют за своим коммутатором. Граница группы сдвигается
+    к самому длинному каналу поблизости: каналы между частями задают шаг синхронизации.
+    Возвращает номер части для каждого устройства"""
+    devices = topology.devices
+    owner = [None] * len(devices)
+    switches = [i for i, d in enumerate(devices) if d.type != 'pc']
+
+    # Обход коммутаторов по кратчайшему каналу (алгоритм Прима, при равных задержках -
+    # в ширину), начиная с первого в каждой компоненте связности. Для каждого коммутатора
+    # запоминается задержка канала, по которому он достигнут (между компонентами - inf)
+    order = []
+    entry = []
+    seen = set()
+    counter = itertools.count()
+    for start in switches:
+        if start in seen:
+            continue
+        heap = [(float('inf'), next(counter), start)]
+        while heap:
+            delay, _, current = heapq.heappop(heap)
+            if current in seen:
+                continue
+            seen.add(current)
+            order.append(current)
+            entry.append(delay)
+            for neighbor in topology.adjacency[current]:
+                if neighbor not in seen and devices[neighbor].type != 'pc':
+                    link = topology.ports[(current, neighbor)].link
+                    heapq.heappush(heap, (link.propagation_s, next(counter), neighbor))
+
+    # Вес коммутатора - он сам и подключенные к нему компьютеры
+    hosts = {i: [n for n in topology.adjacency[i] if devices[n].type == 'pc'] for i in switches}
+    weights = [1 + len(hosts[i]) for i in order]
+    total = sum(weights)
+    filled = [0]
+    for weight in weights:
+        filled.append(filled[-1] + weight)
+
+    # Граница части k - перед коммутатором с самым длинным входным каналом среди тех,
+    # где заполнение отличается от равной доли не больше чем на четверть доли
+    share = total / shards
+    bounds = [0]
+    for k in range(1, min(shards, len(order))):
+        target = share * k
+        candidates = range(bounds[-1] + 1, len(order) - (min(shards, len(order)) - 1 - k))
+        near = [i for i in candidates if abs(filled[i] - target) <= share / 4]
+        if near:
+            bounds.append(max(near, key=lambda i: (entry[i], -abs(filled[i] - target))))
+        else:
+            bounds.append(min(candidates, key=lambda i: abs(filled[i] - target)))
+    bounds.append(len(order))
+
+    for shard in range(len(bounds) - 1):
+        for i in order[bounds[shard]:bounds[shard + 1]]:
+            owner[i] = shard
+            for host in hosts[i]:
+                if owner[host] is None:
+                    owner[host] = shard
+
+    # Компьютеры без коммутатора распределяются по кругу
+    for i, device in enumerate(devices):
+        if owner[i] is None:
+            owner[i] = i % shards
+    return owner
+
+
+def cross_shard_lookahead(topology, owner):
+    """Наименьшая задержка распространения среди каналов между частями, с
+    (пакет из другой части не может прийти раньше - это шаг синхронизации)"""
+    delays = [link.propagation_s for link in topology.link_models if owner[link.a] != owner[link.b]]
+    return min(delays, default=float('inf'))
+
+
+def cross_shard_reach(topology, owner, processing_s):
+    """Для каждого устройства - наименьшее время от события на нем до прибытия
+    порожденного им пакета в другую часть, с (inf - пакеты не уходят из части)
+
+    Коммутатор обрабатывает пакет processing_s до постановки в порт, компьютер
+    пакеты не пересылает. Обратный алгоритм Дейкстры от каналов между частями."""
+    devices = topology.devices
+    delay = [0.0 if device.type == 'pc' else processing_s for device in devices]
+    reach = [float('inf')] * len(devices)
+    heap = []
+    for link in topology.link_models:
+        if owner[link.a] != owner[link.b]:
+            heap.append((delay[link.a] + link.propagation_s, link.a))
+            heap.append((delay[link.b] + link.propagation_s, link.b))
+    heapq.heapify(heap)
+
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if distance >= reach[node]:
+            continue
+        reach[node] = distance
+        # Через компьютер пакеты не проходят - путь продолжается только от коммутатора
+        if devices[node].type == 'pc':
+            continue
+        for neighbor in topology.adjacency[node]:
+            if owner[neighbor] == owner[node]:
+                link = topology.ports[(neighbor, node)].link
+                candidate = delay[neighbor] + link.propagation_s + distance
+                if candidate < reach[neighbor]:
+                    heapq.heappush(heap, (candidate, neighbor))
+    return reach
+
+
+class ShardChannels:
+    """Очереди пакетов между частями сети в разделяемой памяти
+
+    Для каждой пары отправитель-получатель - два буфера (по четности окна синхронизации):
+    в окне k пакеты пишутся в буфер k % 2 и читаются после барьера, в начале окна k + 1.
+    """
+
+    def __init__(self, shards, capacity=4096, name=None):
+        self.shards = shards
+        self.capacity = capacity
+        counts_size = 2 * shards * shards * 8
+        size = counts_size + 2 * shards * shards * capacity * SHARD_RECORD_DTYPE.itemsize
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = attach_memory(name)
+        self.name = self.memory.name
+        self.counts = np.ndarray((2, shards, shards), dtype=np.int64, buffer=self.memory.buf)
+        self.records = np.ndarray((2, shards, shards, capacity), dtype=SHARD_RECORD_DTYPE,
+                                  buffer=self.memory.buf, offset=counts_size)
+        self.outgoing = [[] for _ in range(shards)]
+        self.overflow = 0
+
+    def send(self, target, record):
+        """Пакет для части target (записывается в общую память в конце окна)"""
+        self.outgoing[target].append(record)
+
+    def flush(self, parity, shard):
+        """Запись накопленных за окно пакетов, возвращает число отправленных"""
+        sent = 0
+        for target, records in enumerate(self.outgoing):
+            count = min(len(records), self.capacity)
+            if count:
+                self.records[parity, shard, target, :count] = np.array(records[:count],
+                                                                       dtype=SHARD_RECORD_DTYPE)
+            self.overflow += len(records) - count
+            self.counts[parity, shard, target] = count
+            sent += count
+            records.clear()
+        return sent
+
+    def receive(self, parity, shard):
+        """Пакеты, отправленные этой части в окне с четностью parity"""
+        received = []
+        for source in range(self.shards):
+            count = int(self.counts[parity, source, shard])
+            if count:
+                received.extend(self.records[parity, source, shard, :count].tolist())
+        return received
+
+    def close(self, unlink=False):
+        """Отключение от общей памяти (unlink - удаление блока координатором)"""
+        del self.counts, self.records
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+class ShardStats:
+    """Живая статистика частей сети в разделяемой памяти (для подключения интерфейса)"""
+
+    def __init__(self, shards=None, name=None, external=False):
+        if name is None:
+            rows = shards
+        else:
+            # Подключение к существующему блоку: число частей - в заголовке
+            probe = attach_memory(name, external)
+            rows = int(np.ndarray((1,), dtype=np.float64, buffer=probe.buf)[0])
+            probe.close()
+        row_size = len(STAT_FIELDS) + BUCKET_COUNT
+        size = (STATS_HEADER + 2 * rows * 2 + rows * row_size) * 8
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = attach_memory(name, external)
+        self.name = self.memory.name
+        self.shards = rows
+
+        data = np.ndarray((size // 8,), dtype=np.float64, buffer=self.memory.buf)
+        self.header = data[:STATS_HEADER]
+        # Управление окнами синхронизации: [четность, часть] -> (время ближайшего события, отправлено)
+        self.control = data[STATS_HEADER:STATS_HEADER + 4 * rows].reshape(2, rows, 2)
+        rows_data = data[STATS_HEADER + 4 * rows:].reshape(rows, row_size)
+        self.rows = rows_data[:, :len(STAT_FIELDS)]
+        self.histograms = rows_data[:, len(STAT_FIELDS):]
+        if name is None:
+            data[:] = 0
+            self.header[0] = rows
+
+    def publish(self, shard, values, histogram_counts):
+        """Обновление строки статистики части"""
+        self.rows[shard] = values
+        self.histograms[shard] = histogram_counts
+
+    def totals(self):
+        """Сумма счетчиков по всем частям (время модели - минимальное)"""
+        totals = dict(zip(STAT_FIELDS, self.rows.sum(axis=0).tolist()))
+        totals['virtual_time'] = float(self.rows[:, 0].min())
+        return totals
+
+    def close(self, unlink=False):
+        """Отключение от общей памяти"""
+        del self.header, self.control, self.rows, self.histograms
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
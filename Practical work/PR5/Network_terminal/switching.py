@@ -0,0 +1,157 @@
+import argparse
+import random
+import time
+
+# Параметры таблицы коммутации по умолчанию (как у типовых коммутаторов)
+DEFAULT_AGING_TIME_S = 300.0
+DEFAULT_MAX_ENTRIES = 8192
+
+
+class PortCounters:
+    """Счетчики одного порта коммутатора"""
+    __slots__ = ('rx_packets', 'rx_bytes', 'tx_packets', 'tx_bytes', 'flood_ingress')
+
+    def __init__(self):
+        self.rx_packets = 0
+        self.rx_bytes = 0
+        self.tx_packets = 0  # переданные адресно (по таблице)
+        self.tx_bytes = 0
+        self.flood_ingress = 0  # рассылки, пришедшие с этого порта (на него копия не уходит)
+
+
+class LearningSwitch:
+    """Коммутатор с самообучением: таблица MAC-адрес -> порт со старением записей
+
+    Адрес устройства - его индекс в топологии, порт - индекс соседнего устройства.
+    """
+
+    def __init__(self, ports, aging_time=DEFAULT_AGING_TIME_S, max_entries=DEFAULT_MAX_ENTRIES):
+        self.aging_time = aging_time
+        self.max_entries = max_entries
+        self.ports = {port: PortCounters() for port in ports}
+        self.reset()
+
+    def reset(self):
+        """Очистка таблицы и счетчиков"""
+        self.table = {}  # адрес -> [порт, время последнего появления]
+        self.next_sweep = self.aging_time
+        for port in self.ports:
+            self.ports[port] = PortCounters()
+        self.lookups = 0
+        self.hits = 0
+        self.floods = 0
+        self.flood_bytes = 0
+        self.learned = 0
+        self.moves = 0
+        self.aged_out = 0
+        self.table_full = 0
+
+    def learn(self, address, port, now):
+        """Запоминание порта, за которым находится адрес"""
+        entry = self.table.get(address)
+        if entry is not None:
+            if entry[0] != port:
+                self.moves += 1  # устройство переместилось на другой порт
+                entry[0] = port
+            entry[1] = now
+        elif len(self.table) < self.max_entries:
+            self.table[address] = [port, now]
+            self.learned += 1
+        else:
+            self.table_full += 1
+
+    def lookup(self, address, now):
+        """Порт для адреса или None (адрес неизвестен или запись устарела)"""
+        self.lookups += 1
+        entry = self.table.get(address)
+        if entry is None:
+            return None
+        if now - entry[1] > self.aging_time:
+            del self.table[address]
+            self.aged_out += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def sweep(self, now):
+        """Удаление всех устаревших записей"""
+        limit = now - self.aging_time
+        expired = [address for address, entry in self.table.items() if entry[1] < limit]
+        for address in expired:
+            del self.table[address]
+        self.aged_out += len(expired)
+        self.next_sweep = now + self.aging_time / 2
+
+    def forward(self, source, destination, in_port, size, now):
+        """Решение о продвижении кадра: выходной порт или None (рассылка на все порты)"""
+        if now >= self.next_sweep:
+            self.sweep(now)
+
+        counters = self.ports[in_port]
+        counters.rx_packets += 1
+        counters.rx_bytes += size
+        self.learn(source, in_port, now)
+
+        out_port = self.lookup(destination, now)
+        if out_port is None or out_port == in_port:
+            # Неизвестный получатель (или устаревшая запись, указывающая на входной порт) -
+            # копии уходят во все порты, кроме входного
+            self.floods += 1
+            self.flood_bytes += size
+            counters.flood_ingress += 1
+            return None
+
+        counters = self.ports[out_port]
+        counters.tx_packets += 1
+        counters.tx_bytes += size
+        return out_port
+
+    def port_tx_packets(self, port):
+        """Все переданные через порт кадры, включая копии рассылки"""
+        counters = self.ports[port]
+        return counters.tx_packets + self.floods - counters.flood_ingress
+
+    def hit_rate(self):
+        """Доля поисков, найденных в таблице"""
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+def benchmark(endpoints, decisions, aging_time=DEFAULT_AGING_TIME_S, seed=1):
+    """Скорость принятия решений коммутатором с endpoints устройствами на отдельных портах"""
+    rng = random.Random(seed)
+    switch = LearningSwitch(range(endpoints), aging_time, max_entries=max(endpoints, DEFAULT_MAX_ENTRIES))
+    sources = [rng.randrange(endpoints) for _ in range(decisions)]
+    # Получатель всегда отличается от источника
+    destinations = [(source + rng.randrange(1, endpoints)) % endpoints for source in sources]
+
+    # Модельное время: 100 тыс. кадров в секунду
+    step = 1e-5
+    forward = switch.forward
+    start = time.perf_counter()
+    now = 0.0
+    for source, destination in zip(sources, destinations):
+        forward(source, destination, source, 1000, now)
+        now += step
+    elapsed = time.perf_counter() - start
+    return switch, elapsed
+
+
+def main():
+    """Микротест скорости решений коммутатора"""
+    parser = argparse.ArgumentParser(description="Микротест таблицы коммутации")
+    parser.add_argument("--endpoints", type=int, nargs='+', default=[16, 256, 4096, 16384],
+                        help="число устройств (портов)")
+    parser.add_argument("--decisions", type=int, default=1_000_000, help="число кадров")
+    parser.add_argument("--aging", type=float, default=DEFAULT_AGING_TIME_S,
+                        help="время старения записей, с")
+    args = parser.parse_args()
+
+    print(f"{'устройств':>10} {'решений/с':>14} {'попаданий':>10} {'рассылок':>10} {'записей':>8}")
+    for endpoints in args.endpoints:
+        switch, elapsed = benchmark(endpoints, args.decisions, args.aging)
+        print(f"{endpoints:>10} {args.decisions / elapsed:>14,.0f} {switch.hit_rate():>10.1%} "
+              f"{switch.floods:>10} {len(switch.table):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import json
+import math
+
+from routing import NetworkTopology
+
+
+def load_topology(path, device_factory):
+    """Загрузка топологии из JSON-файла
+
+    Формат файла:
+        {"devices": [{"name": "ПК1", "type": "pc", "x": 100, "y": 100, "buffer": 32}, ...],
+         "links": [["ПК1", "SWITCH"],
+                   ["SWITCH", "SWITCH2", {"bandwidth_mbps": 100, "propagation_ms": 1, "buffer": 64}], ...]}
+    Третий элемент соединения (параметры канала) и емкость буфера устройства необязательны.
+    Если хотя бы у одного устройства нет координат, выполняется автоматическая раскладка.
+    device_factory(name, device_type, x, y) создает объект устройства.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    topology = NetworkTopology()
+    needs_layout = False
+    for item in data["devices"]:
+        if "x" not in item or "y" not in item:
+            needs_layout = True
+        device_type = item.get("type", "pc")
+        if device_type not in ('pc', 'switch'):
+            raise ValueError(f"Неизвестный тип устройства: {device_type}")
+        device = device_factory(item["name"], device_type, item.get("x", 0), item.get("y", 0))
+        if "buffer" in item:
+            device.buffer_capacity = int(item["buffer"])
+        topology.add_device(device)
+
+    for link in data["links"]:
+        name_a, name_b = link[0], link[1]
+        params = link[2] if len(link) > 2 else {}
+        link_params = {}
+        if "bandwidth_mbps" in params:
+            link_params["bandwidth_bps"] = params["bandwidth_mbps"] * 1_000_000
+        if "propagation_ms" in params:
+            link_params["propagation_s"] = params["propagation_ms"] / 1000
+        if "buffer" in params:
+            link_params["buffer_packets"] = int(params["buffer"])
+        topology.add_link(name_a, name_b, **link_params)
+
+    if needs_layout:
+        auto_layout(topology)
+    return topology
+
+
+def auto_layout(topology, host_spacing=60, min_radius=150):
+    """Автоматическая раскладка: коммутаторы по сетке, компьютеры кольцом вокруг своего коммутатора"""
+    devices = topology.devices
+    switches = [i for i, d in enumerate(devices) if d.type != 'pc']
+
+    # Каждый компьютер закрепляется за первым соседним коммутатором
+    groups = {i: [] for i in switches}
+    orphans = []
+    for i, device in enumerate(devices):
+        if device.type != 'pc':
+            continue
+        owner = next((n for n in topology.adjacency[i] if devices[n].type != 'pc'), None)
+        if owner is None:
+            orphans.append(i)
+        else:
+            groups[owner].append(i)
+
+    # Радиус кольца растет с числом компьютеров, шаг сетки - по самому большому кольцу
+    radii = {i: max(min_radius, len(hosts) * host_spacing / (2 * math.pi))
+             for i, hosts in groups.items()}
+    cell = 2 * max(radii.values(), default=min_radius) + 200
+    columns = max(1, math.ceil(math.sqrt(len(switches))))
+
+    for k, i in enumerate(switches):
+        cx = (k % columns) * cell + cell / 2
+        cy = (k // columns) * cell + cell / 2
+        devices[i].x, devices[i].y = cx, cy
+        hosts = groups[i]
+        for j, host in enumerate(hosts):
+            angle = 2 * math.pi * j / len(hosts)
+            devices[host].x = cx + radii[i] * math.cos(angle)
+            devices[host].y = cy + radii[i] * math.sin(angle)
+
+    # Компьютеры без коммутатора - отдельной строкой под сеткой
+    rows = math.ceil(len(switches) / columns) if switches else 0
+    for j, host in enumerate(orphans):
+        devices[host].x = j * host_spacing * 2 + host_spacing
+        devices[host].y = rows * cell + cell / 2
+
+
+def topology_bounds(topology):
+    """Ограничивающий прямоугольник всех устройств"""
+    xs = [d.x for d in topology.devices]
+    ys = [d.y for d in topology.devices]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def generate_topology(switches, hosts_per_switch):
+    """Синтетическая топология: дерево коммутаторов с компьютерами на каждом"""
+    devices = []
+    links = []
+    for k in range(switches):
+        name = f"SW{k + 1}"
+        devices.append({"name": name, "type": "switch"})
+        if k > 0:
+            links.append([f"SW{(k - 1) // 2 + 1}", name])
+        for h in range(hosts_per_switch):
+            host = f"ПК{k * hosts_per_switch + h + 1}"
+            devices.append({"name": host, "type": "pc"})
+            links.append([host, name])
+    return {"devices": devices, "links": links}
+
+
+def main():
+    """Генерация файла синтетической топологии"""
+    parser = argparse.ArgumentParser(description="Генерация топологии ЛВС в JSON")
+    parser.add_argument("output", help="путь к создаваемому JSON-файлу")
+    parser.add_argument("--switches", type=int, default=10, help="число коммутаторов")
+    parser.add_argument("--hosts-per-switch", type=int, default=20,
+                        help="число компьютеров на коммутатор")
+    args = parser.parse_args()
+
+    data = generate_topology(args.switches, args.hosts_per_switch)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    print(f"Сохранено устройств: {len(data['devices'])}, соединений: {len(data['links'])}")
+
+
+if __name__ == "__main__":
+    main()
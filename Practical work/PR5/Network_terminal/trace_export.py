@@ -0,0 +1,82 @@
+import json
+
+# Категории событий трассы
+CATEGORY_PACKET = "packet"
+CATEGORY_ANIMATION = "animation"
+
+# Шаблоны строк событий: мгновенное событие процесса и асинхронный интервал (пара b/e)
+INSTANT_FORMAT = '{"ph":"i","s":"p",%s,"ts":%.3f,"args":{"packet":%d}},'
+SPAN_FORMAT = '{"ph":"b",%s,"id":%d,"ts":%.3f},\n{"ph":"e",%s,"id":%d,"ts":%.3f},'
+
+
+class ChromeTraceWriter:
+    """Потоковая запись жизненного цикла пакетов в формате Chrome Trace Event (JSON для Perfetto)
+
+    Каждое устройство - отдельный процесс трассы: интервалы разных пакетов на одном
+    устройстве перекрываются, поэтому они записываются асинхронными парами b/e с
+    номером пакета. События копятся кортежами и форматируются блоком при сбросе.
+    """
+
+    def __init__(self, path, device_names, buffer_events=8192):
+        self.path = path
+        self.buffer_events = buffer_events
+        self.events = []  # (устройство, имя, категория, пакет, начало с, конец с или None)
+        self.events_written = 0
+        self.heads = {}  # (устройство, имя, категория) -> готовая часть JSON-события
+
+        self.file = open(path, 'w', encoding='utf-8')
+        lines = ["["]
+        for index, name in enumerate(device_names):
+            pid = index + 1
+            lines.append(f'{{"ph":"M","name":"process_name","pid":{pid},'
+                         f'"args":{{"name":{json.dumps(name, ensure_ascii=False)}}}}},')
+            lines.append(f'{{"ph":"M","name":"process_sort_index","pid":{pid},'
+                         f'"args":{{"sort_index":{pid}}}}},')
+        self.file.write("\n".join(lines) + "\n")
+
+    def span(self, device, name, packet_id, start, end, category=CATEGORY_PACKET):
+        """Интервал пакета на устройстве (время модели, с)"""
+        self.events.append((device, name, category, packet_id, start, end))
+        if len(self.events) >= self.buffer_events:
+            self.flush()
+
+    def instant(self, device, name, packet_id, time_s, category=CATEGORY_PACKET):
+        """Мгновенное событие пакета на устройстве"""
+        self.events.append((device, name, category, packet_id, time_s, None))
+        if len(self.events) >= self.buffer_events:
+            self.flush()
+
+    def head(self, device, name, category):
+        """Общая часть события: имя, категория и процесс устройства (кэшируется)"""
+        key = (device, name, category)
+        text = self.heads.get(key)
+        if text is None:
+            text = self.heads[key] = (f'"name":{json.dumps(name, ensure_ascii=False)},'
+                                      f'"cat":"{category}","pid":{device + 1}')
+        return text
+
+    def flush(self):
+        """Форматирование накопленных событий и запись одним блоком"""
+        if not self.events:
+            return
+        heads = self.heads
+        head = self.head
+        lines = []
+        for device, name, category, packet_id, start, end in self.events:
+            text = heads.get((device, name, category)) or head(device, name, category)
+            if end is None:
+                lines.append(INSTANT_FORMAT % (text, start * 1e6, packet_id))
+            else:
+                lines.append(SPAN_FORMAT % (text, packet_id, start * 1e6, text, packet_id, end * 1e6))
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+        self.events_written += len(self.events)
+        self.events = []
+
+    def close(self):
+        """Завершение трассы: последнее событие без запятой и закрывающая скобка массива"""
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.write('{"ph":"M","name":"process_name","pid":0,"args":{"name":"ЛВС"}}\n]\n')
+        self.file.close()
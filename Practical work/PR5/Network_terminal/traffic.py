@@ -0,0 +1,137 @@
+import numpy as np
+
+# Диапазон размеров пакета, байт (как в исходном генераторе)
+MIN_PACKET_SIZE = 100
+MAX_PACKET_SIZE = 1500
+
+
+class ArrivalProcess:
+    """Процесс поступления пакетов: интервалы и размеры генерируются блоками заранее"""
+
+    name = "base"
+
+    def __init__(self, rate, block_size=4096, rng=None):
+        self.rate = rate
+        self.block_size = block_size
+        self.rng = rng or np.random.default_rng()
+        self.gaps = []
+        self.sizes = []
+        self.position = 0
+
+    def set_rate(self, rate):
+        """Изменение средней скорости (оставшийся блок отбрасывается)"""
+        self.rate = rate
+        self.gaps = []
+        self.position = 0
+
+    def generate_gaps(self, count):
+        """Блок интервалов между пакетами, с"""
+        raise NotImplementedError
+
+    def generate_sizes(self, count):
+        """Блок размеров пакетов, байт"""
+        return self.rng.integers(MIN_PACKET_SIZE, MAX_PACKET_SIZE + 1, count)
+
+    def refill(self):
+        """Генерация следующего блока (списки Python - быстрый доступ к элементам)"""
+        self.gaps = self.generate_gaps(self.block_size).tolist()
+        self.sizes = self.generate_sizes(len(self.gaps)).tolist()
+        self.position = 0
+
+    def next_arrival(self):
+        """Интервал до следующего пакета и его размер"""
+        if self.position >= len(self.gaps):
+            self.refill()
+        position = self.position
+        self.position += 1
+        return self.gaps[position], self.sizes[position]
+
+
+class ConstantArrivals(ArrivalProcess):
+    """Постоянный интервал между пакетами"""
+
+    name = "constant"
+
+    def generate_gaps(self, count):
+        return np.full(count, 1.0 / self.rate)
+
+
+class PoissonArrivals(ArrivalProcess):
+    """Пуассоновский поток: экспоненциальные интервалы"""
+
+    name = "poisson"
+
+    def generate_gaps(self, count):
+        return self.rng.exponential(1.0 / self.rate, count)
+
+
+class BurstyArrivals(ArrivalProcess):
+    """Пачечный поток включено/выключено с той же средней скоростью"""
+
+    name = "bursty"
+
+    def __init__(self, rate, on_time=0.5, off_time=1.5, block_size=4096, rng=None):
+        super().__init__(rate, block_size, rng)
+        self.on_time = on_time
+        self.off_time = off_time
+        self.next_burst = 0  # номер пакета в следующем блоке, с которого начнется пачка
+
+    def generate_gaps(self, count):
+        # Во время пачки скорость выше, чтобы средняя совпадала с заданной
+        peak_rate = self.rate * (self.on_time + self.off_time) / self.on_time
+        gaps = self.rng.exponential(1.0 / peak_rate, count)
+
+        # Длины пачек (в пакетах) - геометрическое распределение со средним peak_rate * on_time
+        mean_burst = max(1.0, peak_rate * self.on_time)
+        # Пачка может продолжаться в следующем блоке: храним начало следующей пачки
+        bursts = self.rng.geometric(1.0 / mean_burst, count)
+        starts = self.next_burst + np.concatenate(([0], np.cumsum(bursts)))
+        self.next_burst = starts[np.searchsorted(starts, count)] - count
+        starts = starts[starts < count]
+
+        # Перед первым пакетом каждой пачки - пауза выключенного состояния;
+        # при пачках короче одного пакета пауза удлиняется, сохраняя среднюю скорость
+        off_time = mean_burst / self.rate - mean_burst / peak_rate
+        gaps[starts] += self.rng.exponential(off_time, len(starts))
+        return gaps
+
+
+class TraceArrivals(ArrivalProcess):
+    """Воспроизведение записанной трассы: строки 'время_с,размер' (по кругу)"""
+
+    name = "trace"
+
+    def __init__(self, path, block_size=4096, rng=None):
+        data = np.loadtxt(path, delimiter=',', ndmin=2)
+        times = data[:, 0]
+        self.trace_gaps = np.diff(times, prepend=times[0])
+        self.trace_sizes = data[:, 1].astype(np.int64)
+        self.trace_position = 0
+        super().__init__(len(times) / max(times[-1] - times[0], 1e-9), block_size, rng)
+
+    def set_rate(self, rate):
+        """Скорость трассы задается самой записью"""
+        pass
+
+    def generate_gaps(self, count):
+        indices = (self.trace_position + np.arange(count)) % len(self.trace_gaps)
+        self.block_indices = indices
+        self.trace_position = (self.trace_position + count) % len(self.trace_gaps)
+        return self.trace_gaps[indices]
+
+    def generate_sizes(self, count):
+        return self.trace_sizes[self.block_indices]
+
+
+ARRIVAL_MODELS = {
+    "constant": ConstantArrivals,
+    "poisson": PoissonArrivals,
+    "bursty": BurstyArrivals,
+}
+
+
+def create_arrival_process(model, rate, rng=None, trace=None):
+    """Создание процесса поступления по имени модели"""
+    if trace:
+        return TraceArrivals(trace, rng=rng)
+    return ARRIVAL_MODELS[model](rate, rng=rng)
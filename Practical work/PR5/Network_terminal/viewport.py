@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+
+class Viewport:
+    """Преобразование мировых координат сети в координаты холста (панорама и масштаб)"""
+
+    def __init__(self, scale=1.0, offset_x=0.0, offset_y=0.0):
+        self.scale = scale
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.min_scale = 0.02
+        self.max_scale = 5.0
+
+    def to_screen(self, x, y):
+        """Мировые координаты -> координаты холста"""
+        return x * self.scale + self.offset_x, y * self.scale + self.offset_y
+
+    def to_world(self, sx, sy):
+        """Координаты холста -> мировые координаты"""
+        return (sx - self.offset_x) / self.scale, (sy - self.offset_y) / self.scale
+
+    def visible_rect(self, width, height, margin=0):
+        """Видимая область холста в мировых координатах"""
+        x0, y0 = self.to_world(-margin, -margin)
+        x1, y1 = self.to_world(width + margin, height + margin)
+        return x0, y0, x1, y1
+
+    def pan(self, dx, dy):
+        """Сдвиг изображения на dx, dy пикселей"""
+        self.offset_x += dx
+        self.offset_y += dy
+
+    def zoom(self, factor, sx, sy):
+        """Масштабирование относительно точки холста (sx, sy)"""
+        new_scale = min(self.max_scale, max(self.min_scale, self.scale * factor))
+        factor = new_scale / self.scale
+        self.offset_x = sx - (sx - self.offset_x) * factor
+        self.offset_y = sy - (sy - self.offset_y) * factor
+        self.scale = new_scale
+
+    def fit(self, bounds, width, height, padding=60):
+        """Подбор масштаба и сдвига так, чтобы bounds целиком помещались на холсте"""
+        x0, y0, x1, y1 = bounds
+        span_x = max(x1 - x0, 1)
+        span_y = max(y1 - y0, 1)
+        scale = min((width - 2 * padding) / span_x, (height - 2 * padding) / span_y)
+        self.scale = min(self.max_scale, max(self.min_scale, scale))
+        self.offset_x = (width - span_x * self.scale) / 2 - x0 * self.scale
+        self.offset_y = (height - span_y * self.scale) / 2 - y0 * self.scale
+
+
+class SpatialGrid:
+    """Сеточный пространственный индекс для выборки видимых объектов"""
+
+    def __init__(self, cell_size=250):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+
+    def cell_range(self, x0, y0, x1, y1):
+        """Диапазон ячеек, пересекающих прямоугольник"""
+        size = self.cell_size
+        return (int(min(x0, x1) // size), int(min(y0, y1) // size),
+                int(max(x0, x1) // size), int(max(y0, y1) // size))
+
+    def insert(self, item, x0, y0, x1, y1):
+        """Добавление объекта с ограничивающим прямоугольником"""
+        cx0, cy0, cx1, cy1 = self.cell_range(x0, y0, x1, y1)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells[(cx, cy)].append(item)
+
+    def query(self, x0, y0, x1, y1):
+        """Объекты, ячейки которых пересекают прямоугольник"""
+        cx0, cy0, cx1, cy1 = self.cell_range(x0, y0, x1, y1)
+        found = set()
+        cells = self.cells
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            # Видимая область больше занятой: обходим только непустые ячейки
+            for (cx, cy), items in cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    found.update(items)
+            return found
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                items = cells.get((cx, cy))
+                if items:
+                    found.update(items)
+        return found